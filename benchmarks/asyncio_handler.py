@@ -0,0 +1,70 @@
+"""
+Compare event loop latency under heavy logging with and without `AsyncioStreamHandler`.
+
+Usage:
+
+    python benchmarks/asyncio_handler.py
+
+"""
+from asyncio import gather, run, sleep
+from logging import INFO, Logger, StreamHandler
+from statistics import mean
+from time import perf_counter, sleep as blocking_sleep
+
+from microcosm_logging.handlers import AsyncioStreamHandler
+
+
+class SlowStream:
+    """
+    A stream that blocks on every write, like a congested stdout pipe.
+
+    """
+    def write(self, value):
+        blocking_sleep(0.0005)
+
+    def flush(self):
+        pass
+
+
+async def measure_latency(ticks, interval):
+    latencies = []
+    for _ in range(ticks):
+        start_time = perf_counter()
+        await sleep(interval)
+        latencies.append(perf_counter() - start_time - interval)
+    return latencies
+
+
+async def log_heavily(logger, count):
+    for index in range(count):
+        logger.info("Processed item %s", index)
+        if index % 10 == 0:
+            await sleep(0)
+
+
+async def benchmark(handler):
+    logger = Logger("benchmark", INFO)
+    logger.addHandler(handler)
+
+    latencies, _ = await gather(
+        measure_latency(ticks=200, interval=0.001),
+        log_heavily(logger, count=2000),
+    )
+    if isinstance(handler, AsyncioStreamHandler):
+        await handler.drain()
+    return latencies
+
+
+def main():
+    for handler in (StreamHandler(SlowStream()), AsyncioStreamHandler(SlowStream())):
+        latencies = sorted(run(benchmark(handler)))
+        print("{:>24}: mean {:.2f}ms, p99 {:.2f}ms, max {:.2f}ms".format(
+            type(handler).__name__,
+            mean(latencies) * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000,
+            latencies[-1] * 1000,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark the cost of disabled logging calls: a standard library logger versus a fast logger
+(see `@logger(fast=True)`), against the floor of calling a no-op directly.
+
+Usage:
+
+    python benchmarks/disabled_logging.py
+
+"""
+from logging import INFO, getLogger
+from timeit import repeat
+
+from microcosm_logging.decorators import FastLogger, noop
+
+
+def main():
+    logger = getLogger("benchmark")
+    logger.setLevel(INFO)
+    fast_logger = FastLogger(logger)
+    number = 100000
+    funcs = (
+        ("noop", lambda: noop("Processed %s.", 42)),
+        ("noop (extra)", lambda: noop("Processed.", extra=dict(count=42))),
+        ("Logger.debug", lambda: logger.debug("Processed %s.", 42)),
+        ("Logger.debug (extra)", lambda: logger.debug("Processed.", extra=dict(count=42))),
+        ("FastLogger.debug", lambda: fast_logger.debug("Processed %s.", 42)),
+        ("FastLogger.debug (extra)", lambda: fast_logger.debug("Processed.", extra=dict(count=42))),
+    )
+
+    # interleave the rounds, so that noise on the machine affects every candidate alike
+    best = {}
+    for _ in range(10):
+        for name, func in funcs:
+            elapsed = min(repeat(func, number=number, repeat=3))
+            best[name] = min(best.get(name, elapsed), elapsed)
+
+    for name, _ in funcs:
+        print("{:>26}: {:.1f}ns per call".format(name, best[name] / number * 1e9))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark finding a record's extras: scanning every attribute against a reserved set
+versus reading the keys tracked at record creation.
+
+Usage:
+
+    python benchmarks/extra_keys.py
+
+"""
+from logging import INFO, Logger
+from timeit import timeit
+
+from pythonjsonlogger.jsonlogger import RESERVED_ATTRS, merge_record_extra
+
+from microcosm_logging.records import extra_keys, track_extra_keys
+
+
+def make_record():
+    logger = Logger("benchmark")
+    return logger.makeRecord(
+        "benchmark",
+        INFO,
+        __file__,
+        42,
+        "Request handled.",
+        (),
+        None,
+        extra=dict(request_id="abc", elapsed_time=12.5),
+    )
+
+
+def main():
+    reserved = dict(zip(RESERVED_ATTRS, RESERVED_ATTRS))
+    untracked = make_record()
+    track_extra_keys()
+    tracked = make_record()
+    number = 100000
+
+    for name, func in (
+        ("merge_record_extra", lambda: merge_record_extra(untracked, dict(), reserved=reserved)),
+        ("extra_keys (scan)", lambda: {key: untracked.__dict__[key] for key in extra_keys(untracked)}),
+        ("extra_keys (tracked)", lambda: {key: tracked.__dict__[key] for key in extra_keys(tracked)}),
+    ):
+        elapsed = timeit(func, number=number)
+        print("{:>24}: {:.3f}us per record".format(name, elapsed / number * 1e6))
+
+
+if __name__ == "__main__":
+    main()
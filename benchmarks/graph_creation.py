@@ -0,0 +1,38 @@
+"""
+Benchmark object graph creation with and without reusing an identical logging configuration.
+
+Usage:
+
+    python benchmarks/graph_creation.py
+
+"""
+from timeit import timeit
+
+from microcosm.api import create_object_graph
+
+import microcosm_logging.factories
+
+
+def create_graph():
+    graph = create_object_graph(name="benchmark", testing=True)
+    graph.use("logger")
+    return graph
+
+
+def create_graph_without_reuse():
+    microcosm_logging.factories._applied_config = None
+    return create_graph()
+
+
+def main():
+    number = 200
+    for name, func in (
+        ("reconfigure", create_graph_without_reuse),
+        ("reuse", create_graph),
+    ):
+        elapsed = timeit(func, number=number)
+        print("{:>12}: {:.3f}ms per graph".format(name, elapsed / number * 1000))
+
+
+if __name__ == "__main__":
+    main()
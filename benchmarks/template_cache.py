@@ -0,0 +1,67 @@
+"""
+Benchmark `ExtraConsoleFormatter` over a realistic distribution of message templates.
+
+Compares the cached template analysis against substituting every record attribute by
+trying old-style and then new-style formatting.
+
+Usage:
+
+    python benchmarks/template_cache.py
+
+"""
+from logging import INFO, LogRecord
+from random import Random
+from timeit import timeit
+
+from pythonjsonlogger.jsonlogger import merge_record_extra
+
+from microcosm_logging.formatters import ExtraConsoleFormatter
+
+
+class UncachedFormatter(ExtraConsoleFormatter):
+    """
+    Substitutes extras the way `ExtraConsoleFormatter` did before caching template analysis.
+
+    """
+    def format_extra(self, message, record):
+        extra = merge_record_extra(record=record, target=dict(), reserved=dict())
+        return self.format_safely(message, **extra)
+
+
+TEMPLATES = [
+    # (weight, msg, args, extra)
+    (50, "Request handled.", None, dict(request_id="abc", elapsed_time=12.5)),
+    (20, "Cache miss for {key}.", None, dict(key="users:42", request_id="abc")),
+    (15, "Retrying {operation} after {delay}s.", None, dict(operation="fetch", delay=0.5, attempt=2)),
+    (10, "Processed %s items.", (1000,), dict(request_id="abc")),
+    (5, "Rendered {template} in {elapsed_time}ms for {user}.", None, dict(
+        template="index", elapsed_time=3.2, user="alice", request_id="abc",
+    )),
+]
+
+
+def make_records(count=10000, seed=42):
+    random = Random(seed)
+    weights = [weight for weight, *_ in TEMPLATES]
+    records = []
+    for _, msg, args, extra in random.choices(TEMPLATES, weights=weights, k=count):
+        record = LogRecord("benchmark", INFO, __file__, 42, msg, args, None)
+        record.__dict__.update(extra)
+        records.append(record)
+    return records
+
+
+def main():
+    records = make_records()
+    format_string = "{asctime} - {name} - [{levelname}] - {message}"
+
+    for formatter in (UncachedFormatter(format_string), ExtraConsoleFormatter(format_string)):
+        elapsed = timeit(lambda: [formatter.format(record) for record in records], number=10)
+        print("{:>24}: {:.2f}us per record".format(
+            type(formatter).__name__,
+            elapsed / (10 * len(records)) * 1e6,
+        ))
+
+
+if __name__ == "__main__":
+    main()
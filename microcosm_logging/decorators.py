@@ -1,8 +1,32 @@
 """Decorator library for common logging functionality."""
-from logging import LoggerAdapter, getLogger
+from logging import (
+    CRITICAL,
+    DEBUG,
+    ERROR,
+    INFO,
+    WARNING,
+    Logger,
+    LoggerAdapter,
+    getLogger,
+)
+from weakref import WeakSet
 
 
-def logger(obj):
+# the level of each per-level logging method
+METHOD_LEVELS = dict(
+    debug=DEBUG,
+    info=INFO,
+    warning=WARNING,
+    error=ERROR,
+    exception=ERROR,
+    critical=CRITICAL,
+)
+
+# every fast logger, so that their methods can be rebound when levels change
+_fast_loggers = WeakSet()
+
+
+def logger(obj=None, fast=False):
     """
     logging decorator, assigning an object the `logger` property.
     Can be used on a Python class, e.g:
@@ -11,12 +35,86 @@ def logger(obj):
         class MyClass:
             ...
 
+    With `fast=True`, the logger is a `FastLogger`, for which disabled calls are (nearly) free:
+
+        @logger(fast=True)
+        class MyClass:
+            ...
 
     """
-    obj.logger = getLogger(obj.__name__)
+    if obj is None:
+        return lambda obj: logger(obj, fast=fast)
+
+    obj.logger = FastLogger(getLogger(obj.__name__)) if fast else getLogger(obj.__name__)
     return obj
 
 
+def noop(*args, **kwargs):
+    pass
+
+
+class FastLogger:
+    """
+    A facade over a logger that binds each per-level method (`debug()`, `info()`, ...) to
+    a no-op while its level is disabled, and to the logger's own method otherwise.
+
+    Methods are rebound by `refresh_fast_loggers()`, which `configure_logging`,
+    `ConditionalLoggingLevel.setLevel` and `FastLogger.setLevel` call; code that calls
+    `Logger.setLevel` directly should call it too. Loggers whose effective level is not a
+    plain int (i.e. a `ConditionalLoggingLevel`) are checked on every call, as usual.
+
+    Everything else is delegated to the logger through properties (see `DELEGATED`), rather
+    than `__getattr__`, which would slow down every attribute lookup, including the hot ones.
+
+    """
+    def __init__(self, logger):
+        self.logger = logger
+        self.refresh()
+        _fast_loggers.add(self)
+
+    def refresh(self):
+        dynamic = not isinstance(self.logger.getEffectiveLevel(), int)
+        for name, level in METHOD_LEVELS.items():
+            if dynamic or self.logger.isEnabledFor(level):
+                setattr(self, name, getattr(self.logger, name))
+            else:
+                setattr(self, name, noop)
+
+    def setLevel(self, level):
+        self.logger.setLevel(level)
+        refresh_fast_loggers()
+
+    def __repr__(self):
+        return "<{} {!r}>".format(self.__class__.__name__, self.logger)
+
+
+def delegate(name):
+    return property(
+        lambda self: getattr(self.logger, name),
+        lambda self, value: setattr(self.logger, name, value),
+    )
+
+
+# the logger attributes and methods that a fast logger delegates
+DELEGATED = sorted(
+    name
+    for name in set(dir(Logger)) | set(vars(Logger("")))
+    if not name.startswith("__") and name not in METHOD_LEVELS and not hasattr(FastLogger, name)
+)
+
+for name in DELEGATED:
+    setattr(FastLogger, name, delegate(name))
+
+
+def refresh_fast_loggers():
+    """
+    Rebind the methods of every fast logger to the current levels.
+
+    """
+    for fast_logger in list(_fast_loggers):
+        fast_logger.refresh()
+
+
 class ContextLogger(LoggerAdapter):
     """
     Allows for inserting additional context into log records based on the current context.
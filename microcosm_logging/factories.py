@@ -2,18 +2,47 @@
 Factory that configures logging.
 
 """
+from json import dumps
 from logging import (
     CRITICAL,
+    INFO,
+    NOTSET,
+    Logger,
+    PlaceHolder,
+    getLevelName,
     getLogger,
     getLogRecordFactory,
     setLogRecordFactory,
 )
-from logging.config import dictConfig
+from logging.config import BaseConfigurator, dictConfig
 from os import environ
 from typing import Dict
 
 from microcosm.api import defaults, typed
 
+from microcosm_logging.decorators import refresh_fast_loggers
+from microcosm_logging.forking import register_fork_hooks
+from microcosm_logging.profiling import profiler
+from microcosm_logging.records import track_extra_keys
+
+
+# the last configuration applied by `configure_logging`, so that identical configurations
+# (e.g. from the many object graphs of a test suite) can reuse the existing handlers
+_applied_config = None
+
+# the last level bump mapping applied by `configure_logging`
+_bumped_levels = None
+
+# the configuration key for each handler
+HANDLER_CONFIG_KEYS = dict(
+    console="stream_handler",
+    Counters="counters",
+    FlightRecorder="flight_recorder",
+    FramedHandler="framed",
+    LogglyHTTPSHandler="loggly",
+    LogstashHandler="logstash",
+)
+
 
 @defaults(
     default_format="{asctime} - {name} - [{levelname}] - {message}",
@@ -24,7 +53,7 @@ from microcosm.api import defaults, typed
     ),
 
     json_formatter=dict(
-        formatter="pythonjsonlogger.jsonlogger.JsonFormatter",
+        formatter="microcosm_logging.formatters.JSONFormatter",
     ),
 
     # default log level is INFO
@@ -62,6 +91,9 @@ from microcosm.api import defaults, typed
     # loggly
     loggly=dict(
         base_url="https://logs-01.loggly.com",
+        level=None,
+        include=[],
+        exclude=[],
     ),
 
     # logstash
@@ -69,13 +101,99 @@ from microcosm.api import defaults, typed
         enabled=typed(bool, default_value=False),
         host="localhost",
         port=5959,
+        level=None,
+        include=[],
+        exclude=[],
+    ),
+
+    # length-prefixed msgpack output for sidecar log collectors; transport is one of
+    # "stdout" (replacing the console handler), "unix" (stream socket) or "datagram"
+    framed=dict(
+        enabled=typed(bool, default_value=False),
+        transport="stdout",
+        host="localhost",
+        port=typed(int, default_value=5170),
+        path=None,
+        level=None,
+        include=[],
+        exclude=[],
+    ),
+
+    # truncate oversized records; shared by the console, json and framed formatters
+    limits=dict(
+        max_message_length=typed(int, default_value=None),
+        max_field_length=typed(int, default_value=None),
+        max_collection_length=typed(int, default_value=None),
+        max_depth=typed(int, default_value=None),
+        max_record_bytes=typed(int, default_value=None),
+    ),
+
+    # sample records below WARNING consistently per request; rates may be set per level
+    # (e.g. `info=0.1`) or per logger name; context ids are read from the `keys` record attributes
+    sampling=dict(
+        enabled=typed(bool, default_value=False),
+        rate=typed(float, default_value=1.0),
+        levels=dict(
+            debug=None,
+            info=None,
+        ),
+        loggers=dict(),
+        keys=[
+            "request_id",
+            "trace_id",
+        ],
+    ),
+
+    # aggregate counts per (logger, level, message template) and emit a periodic summary;
+    # `fields` names numeric extras to aggregate and `count_only` templates are never emitted
+    counters=dict(
+        enabled=typed(bool, default_value=False),
+        interval=typed(float, default_value=60.0),
+        max_keys=typed(int, default_value=1000),
+        fields=[],
+        count_only=[],
+        level=None,
+        include=[],
+        exclude=[],
+    ),
+
+    # retain recent records per context at `level` and replay them to the `target` handler
+    # (by default, the console or the framed output that replaces it) when a record at
+    # `flush_level` occurs in the same context
+    flight_recorder=dict(
+        enabled=typed(bool, default_value=False),
+        level="DEBUG",
+        flush_level="ERROR",
+        capacity=typed(int, default_value=100),
+        max_contexts=typed(int, default_value=1000),
+        target=None,
+        keys=[
+            "request_id",
+            "trace_id",
+        ],
+        include=[],
+        exclude=[],
+    ),
+
+    # account for logging overhead per call site and per handler
+    profile=dict(
+        enabled=typed(bool, default_value=False),
+        sample_rate=typed(float, default_value=1.0),
+        limit=typed(int, default_value=20),
+        dump_at_exit=typed(bool, default_value=True),
     ),
 
     # configure stream handler
+    #
+    # each handler may set its own `level` (defaulting to `logging.level`) and route only records
+    # from loggers that match its `include` names (if any) and do not match its `exclude` names
     stream_handler=dict(
         class_="logging.StreamHandler",
         formatter="ExtraFormatter",
         stream="ext://sys.stdout",
+        level=None,
+        include=[],
+        exclude=[],
     ),
 )
 def configure_logging(graph):
@@ -84,12 +202,21 @@ def configure_logging(graph):
 
      - Tunes logging levels.
      - Sets up console and, if not in debug, loggly output.
+     - Keeps the configured handlers usable in forked processes.
 
     :returns: a logger instance of the configured name
 
     """
     dict_config = make_dict_config(graph)
-    dictConfig(dict_config)
+    apply_dict_config(dict_config)
+    bump_library_levels(graph)
+    refresh_fast_loggers()
+    register_fork_hooks()
+    track_extra_keys()
+
+    if graph.config.logging.profile.enabled:
+        profile_logging(graph)
+
     return True
 
 
@@ -102,6 +229,105 @@ def configure_logger(graph):
     return getLogger(graph.metadata.name)
 
 
+def apply_dict_config(dict_config):
+    """
+    Apply a dictionary configuration, reusing the existing handlers if only levels differ.
+
+    Reusing handlers still resets everything else that a full configuration would: the
+    levels of the configured loggers and handlers, and the children of configured loggers.
+    Everything is reapplied if the root logger's handlers were changed by anything else.
+
+    """
+    global _applied_config
+
+    structure = make_fingerprint(without_levels(dict_config))
+
+    if (
+        _applied_config is not None
+        and _applied_config["structure"] == structure
+        and _applied_config["handlers"] == tuple(getLogger().handlers)
+    ):
+        dictConfig(make_incremental_config(dict_config))
+        reset_existing_loggers(dict_config)
+        return
+
+    dictConfig(dict_config)
+    _applied_config = dict(
+        structure=structure,
+        handlers=tuple(getLogger().handlers),
+    )
+
+
+def reset_existing_loggers(dict_config):
+    """
+    Reset existing loggers as `dictConfig` does (without disabling any).
+
+    """
+    prefixes = tuple(name + "." for name in dict_config["loggers"] if name)
+    for name, logger in list(Logger.manager.loggerDict.items()):
+        if isinstance(logger, PlaceHolder) or name in dict_config["loggers"]:
+            continue
+        if name.startswith(prefixes):
+            logger.setLevel(NOTSET)
+            logger.handlers = []
+            logger.propagate = True
+        logger.disabled = False
+
+
+def make_fingerprint(dict_config):
+    return dumps(resolve_external(dict_config), sort_keys=True, default=str)
+
+
+def resolve_external(value):
+    """
+    Tag `ext://` references with the identity of the object they currently resolve to, so that
+    a configuration is reapplied once e.g. `sys.stdout` is redirected.
+
+    """
+    if isinstance(value, dict):
+        return {key: resolve_external(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [resolve_external(item) for item in value]
+    if isinstance(value, str) and value.startswith("ext://"):
+        try:
+            return "{}@{}".format(value, id(BaseConfigurator({}).ext_convert(value[len("ext://"):])))
+        except ValueError:
+            # left to `dictConfig` to report
+            return value
+    return value
+
+
+def without_levels(dict_config):
+    return dict(
+        dict_config,
+        handlers={
+            name: {key: value for key, value in handler.items() if key != "level"}
+            for name, handler in dict_config["handlers"].items()
+        },
+        loggers={
+            name: {key: value for key, value in logger.items() if key != "level"}
+            for name, logger in dict_config["loggers"].items()
+        },
+    )
+
+
+def make_incremental_config(dict_config):
+    return dict(
+        version=1,
+        incremental=True,
+        handlers={
+            name: {"level": handler["level"]}
+            for name, handler in dict_config["handlers"].items()
+            if "level" in handler
+        },
+        loggers={
+            name: {"level": logger["level"]}
+            for name, logger in dict_config["loggers"].items()
+            if "level" in logger
+        },
+    )
+
+
 def enable_loggly(graph):
     """
     Enable loggly if it is configured and not debug/testing.
@@ -122,12 +348,21 @@ def enable_loggly(graph):
     return True
 
 
+def enable_framed_stdout(graph):
+    """
+    Framed output to stdout replaces the console handler.
+
+    """
+    return graph.config.logging.framed.enabled and graph.config.logging.framed.transport == "stdout"
+
+
 def make_dict_config(graph):
     """
     Build a dictionary configuration from conventions and configuration.
 
     """
     formatters = {}
+    filters = {}
     handlers = {}
     loggers = {}
 
@@ -135,8 +370,14 @@ def make_dict_config(graph):
     formatters["ExtraFormatter"] = make_extra_console_formatter(graph)
     formatters["JSONFormatter"] = make_json_formatter(graph)
 
-    # create the console handler with the configured formatter
-    handlers["console"] = make_stream_handler(graph, formatter=graph.config.logging.stream_handler.formatter)
+    # create the console handler with the configured formatter, unless replaced by framed output
+    if not enable_framed_stdout(graph):
+        handlers["console"] = make_stream_handler(graph, formatter=graph.config.logging.stream_handler.formatter)
+
+    # maybe create the framed handler
+    if graph.config.logging.framed.enabled:
+        formatters["FramedFormatter"] = make_framed_formatter(graph)
+        handlers["FramedHandler"] = make_framed_handler(graph, formatter="FramedFormatter")
 
     # maybe create the loggly handler
     if enable_loggly(graph):
@@ -144,22 +385,46 @@ def make_dict_config(graph):
 
     # create the logstash handler only if explicitly configured
     if graph.config.logging.logstash.enabled:
-        handlers["LogstashHandler"] = make_logstash_handler(graph)
+        formatters["LogstashFormatter"] = make_logstash_formatter(graph)
+        handlers["LogstashHandler"] = make_logstash_handler(graph, formatter="LogstashFormatter")
+
+    # maybe drop count-only templates from the output handlers
+    if graph.config.logging.counters.enabled and graph.config.logging.counters.count_only:
+        filters["CountOnly"] = make_count_only_filter(graph)
+        for handler in handlers.values():
+            handler.setdefault("filters", []).append("CountOnly")
+
+    # maybe sample low-severity records before any handler formats them
+    if graph.config.logging.sampling.enabled:
+        filters["Sampling"] = make_sampling_filter(graph)
+        for handler in handlers.values():
+            handler.setdefault("filters", []).append("Sampling")
+
+    # maybe count all records
+    if graph.config.logging.counters.enabled:
+        handlers["Counters"] = make_counting_handler(graph, handlers)
+
+    # maybe retain records to replay on error; first, so that they precede the error in the output
+    if graph.config.logging.flight_recorder.enabled:
+        handlers = dict(FlightRecorder=make_flight_recorder_handler(graph, handlers), **handlers)
+
+    # route records to handlers by logger name
+    filters.update(make_routing_filters(graph, handlers))
 
     # configure the root logger to output to all handlers
     loggers[""] = {
-        "handlers": handlers.keys(),
-        "level": graph.config.logging.level,
+        "handlers": list(handlers),
+        "level": make_root_level(graph, handlers),
     }
 
     # set log levels for libraries
     loggers.update(make_library_levels(graph))
-    bump_library_levels(graph)
 
     return dict(
         version=1,
         disable_existing_loggers=False,
         formatters=formatters,
+        filters=filters,
         handlers=handlers,
         loggers=loggers,
     )
@@ -171,10 +436,10 @@ def make_json_formatter(graph):
 
     """
 
-    return {
+    return with_limits(graph, {
         "()": graph.config.logging.json_formatter.formatter,
         "fmt": graph.config.logging.json_required_keys,
-    }
+    })
 
 
 def make_extra_console_formatter(graph):
@@ -183,10 +448,45 @@ def make_extra_console_formatter(graph):
 
     """
 
-    return {
+    return with_limits(graph, {
         "()": "microcosm_logging.formatters.ExtraConsoleFormatter",
         "format_string": graph.config.logging.default_format,
+    })
+
+
+def make_framed_formatter(graph):
+    """
+    Create the length-prefixed msgpack formatter.
+
+    """
+    return with_limits(graph, {
+        "()": "microcosm_logging.formatters.FramedFormatter",
+    })
+
+
+def make_logstash_formatter(graph):
+    """
+    Create the logstash formatter.
+
+    """
+    return with_limits(graph, {
+        "()": "microcosm_logging.formatters.LogstashFormatter",
+    })
+
+
+def with_limits(graph, formatter):
+    """
+    Pass any configured size limits to a formatter.
+
+    """
+    limits = {
+        key: value
+        for key, value in graph.config.logging.limits.items()
+        if value is not None
     }
+    if limits:
+        formatter["limits"] = limits
+    return formatter
 
 
 def make_stream_handler(graph, formatter):
@@ -197,11 +497,45 @@ def make_stream_handler(graph, formatter):
     return {
         "class": graph.config.logging.stream_handler.class_,
         "formatter": formatter,
-        "level": graph.config.logging.level,
+        "level": make_handler_level(graph, graph.config.logging.stream_handler),
         "stream": graph.config.logging.stream_handler.stream,
     }
 
 
+def make_framed_handler(graph, formatter):
+    """
+    Create the framed handler for the configured transport.
+
+    """
+    transport = graph.config.logging.framed.transport
+    if transport == "stdout":
+        handler = {
+            "class": "microcosm_logging.handlers.FramedStreamHandler",
+            "stream": "ext://sys.stdout",
+        }
+    elif transport == "unix":
+        if not graph.config.logging.framed.path:
+            raise ValueError("Framed log transport unix requires a path")
+        handler = {
+            "class": "microcosm_logging.handlers.FramedSocketHandler",
+            "host": graph.config.logging.framed.path,
+        }
+    elif transport == "datagram":
+        handler = {
+            "class": "microcosm_logging.handlers.FramedDatagramHandler",
+            "host": graph.config.logging.framed.path or graph.config.logging.framed.host,
+            "port": None if graph.config.logging.framed.path else graph.config.logging.framed.port,
+        }
+    else:
+        raise ValueError("Unsupported framed log transport: {}".format(transport))
+
+    handler.update(
+        formatter=formatter,
+        level=make_handler_level(graph, graph.config.logging.framed),
+    )
+    return handler
+
+
 def make_loggly_handler(graph, formatter):
     """
     Create the loggly handler.
@@ -223,12 +557,12 @@ def make_loggly_handler(graph, formatter):
     return {
         "class": graph.config.logging.https_handler.class_,
         "formatter": formatter,
-        "level": graph.config.logging.level,
+        "level": make_handler_level(graph, graph.config.logging.loggly),
         "url": loggly_url,
     }
 
 
-def make_logstash_handler(graph):
+def make_logstash_handler(graph, formatter):
     """
     Create the logstash handler
 
@@ -239,11 +573,130 @@ def make_logstash_handler(graph):
     """
     return {
         "class": "logstash_async.handler.SynchronousLogstashHandler",
+        "formatter": formatter,
         "host": graph.config.logging.logstash.host,
+        "level": make_handler_level(graph, graph.config.logging.logstash),
         "port": graph.config.logging.logstash.port,
     }
 
 
+def make_handler_level(graph, handler_config):
+    """
+    Use the handler's own level, if configured, or else the global level.
+
+    """
+    return handler_config.level or graph.config.logging.level
+
+
+def levelno(level):
+    return level if isinstance(level, int) else getLevelName(level)
+
+
+def make_root_level(graph, handlers):
+    """
+    Let the root logger create records for the most verbose handler.
+
+    """
+    return min(
+        [graph.config.logging.level] + [handler["level"] for handler in handlers.values()],
+        key=levelno,
+    )
+
+
+def make_routing_filters(graph, handlers):
+    """
+    Create logger name routing filters for any handlers that configure them.
+
+    Filters run before handlers format records, so dropped records are never formatted.
+
+    """
+    filters = {}
+    for name, handler in handlers.items():
+        handler_config = graph.config.logging[HANDLER_CONFIG_KEYS[name]]
+        if not handler_config.include and not handler_config.exclude:
+            continue
+
+        filter_name = "{}Routing".format(name)
+        filters[filter_name] = {
+            "()": "microcosm_logging.filters.RoutingFilter",
+            "include": handler_config.include,
+            "exclude": handler_config.exclude,
+        }
+        handler.setdefault("filters", []).append(filter_name)
+    return filters
+
+
+def make_counting_handler(graph, handlers):
+    """
+    Create the log counting handler.
+
+    Its summary is emitted at (at least) the level of every output handler, so that none of
+    them drops it.
+
+    """
+    summary_level = max(
+        [INFO, levelno(graph.config.logging.level)]
+        + [levelno(handler["level"]) for handler in handlers.values()],
+    )
+    return {
+        "class": "microcosm_logging.handlers.CountingHandler",
+        "interval": graph.config.logging.counters.interval,
+        "max_keys": graph.config.logging.counters.max_keys,
+        "fields": graph.config.logging.counters.fields,
+        "summary_level": summary_level,
+        "level": make_handler_level(graph, graph.config.logging.counters),
+    }
+
+
+def make_flight_recorder_handler(graph, handlers):
+    """
+    Create the flight recorder handler.
+
+    Its level is independent of the global level.
+
+    """
+    target = graph.config.logging.flight_recorder.target
+    if target is None:
+        target = "FramedHandler" if enable_framed_stdout(graph) else "console"
+    if target not in handlers:
+        raise ValueError("Flight recorder target handler is not configured: {}".format(target))
+
+    return {
+        "class": "microcosm_logging.handlers.FlightRecorderHandler",
+        "capacity": graph.config.logging.flight_recorder.capacity,
+        "flushLevel": graph.config.logging.flight_recorder.flush_level,
+        "keys": graph.config.logging.flight_recorder.keys,
+        "level": graph.config.logging.flight_recorder.level,
+        "max_contexts": graph.config.logging.flight_recorder.max_contexts,
+        "target": target,
+    }
+
+
+def make_count_only_filter(graph):
+    """
+    Create the filter that drops count-only templates.
+
+    """
+    return {
+        "()": "microcosm_logging.filters.CountOnlyFilter",
+        "templates": graph.config.logging.counters.count_only,
+    }
+
+
+def make_sampling_filter(graph):
+    """
+    Create the request-consistent sampling filter.
+
+    """
+    return {
+        "()": "microcosm_logging.filters.SamplingFilter",
+        "rate": graph.config.logging.sampling.rate,
+        "levels": dict(graph.config.logging.sampling.levels),
+        "loggers": dict(graph.config.logging.sampling.loggers),
+        "keys": graph.config.logging.sampling.keys,
+    }
+
+
 def make_library_levels(graph):
     """
     Create third party library logging level configurations.
@@ -269,6 +722,21 @@ def make_library_levels(graph):
     return levels
 
 
+def profile_logging(graph):
+    """
+    Account for the overhead of the configured handlers.
+
+    The report can be dumped on demand via `microcosm_logging.profiling.profiler.dump()`.
+
+    """
+    profiler.sample_rate = graph.config.logging.profile.sample_rate
+    profiler.limit = graph.config.logging.profile.limit
+    profiler.instrument(getLogger())
+
+    if graph.config.logging.profile.dump_at_exit:
+        profiler.dump_at_exit()
+
+
 def bump_level_factory(mapping: Dict[str, int]):
     factory = getLogRecordFactory()
 
@@ -280,13 +748,21 @@ def bump_level_factory(mapping: Dict[str, int]):
             **kwargs,
         )
 
+    apply.__wrapped__ = factory
     return apply
 
 
 def bump_library_levels(graph):
+    global _bumped_levels
+
     if not graph.config.logging.levels.bump:
         return
 
+    # each bump wraps the current factory; never wrap the same bump twice
+    if graph.config.logging.levels.bump == _bumped_levels:
+        return
+    _bumped_levels = dict(graph.config.logging.levels.bump)
+
     setLogRecordFactory(
         bump_level_factory(graph.config.logging.levels.bump),
     )
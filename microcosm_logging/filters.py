@@ -0,0 +1,144 @@
+"""
+Logging filters.
+
+"""
+from logging import WARNING, Filter, getLevelName
+from random import random
+from zlib import crc32
+
+
+# the record attribute holding its sample, shared by the sampling filters of all handlers
+SAMPLE = "_sample"
+
+# the record attribute that exempts a record (e.g. a counters summary) from sampling and count-only filtering
+UNFILTERED = "_unfiltered"
+
+
+class RoutingFilter(Filter):
+    """
+    Route records to a handler by logger name.
+
+    Names match a logger and all of its descendants; the most specific matching name
+    decides. Records from loggers that match no name pass only if there is nothing to
+    `include`.
+
+    Decisions are computed once per logger name and cached.
+
+    """
+    def __init__(self, include=(), exclude=()):
+        super().__init__()
+        self.rules = sorted(
+            [(name, True) for name in include] + [(name, False) for name in exclude],
+            key=lambda rule: len(rule[0]),
+            reverse=True,
+        )
+        self.default = not include
+        self.cache = {}
+
+    def filter(self, record):
+        try:
+            return self.cache[record.name]
+        except KeyError:
+            result = self.cache[record.name] = self.route(record.name)
+            return result
+
+    def route(self, name):
+        for prefix, result in self.rules:
+            if name == prefix or name.startswith(prefix + "."):
+                return result
+        return self.default
+
+
+class CountOnlyFilter(Filter):
+    """
+    Drop records whose message template is only counted (see `CountingHandler`).
+
+    """
+    def __init__(self, templates=()):
+        super().__init__()
+        self.templates = frozenset(templates)
+
+    def filter(self, record):
+        if record.__dict__.get(UNFILTERED):
+            return True
+        return not (isinstance(record.msg, str) and record.msg in self.templates)
+
+
+def record_context_id(record, keys):
+    """
+    Find the id of the context (e.g. request or trace) a record was logged in.
+
+    Context ids are record attributes, usually supplied via `extra` or a `ContextLogger`.
+
+    """
+    for key in keys:
+        value = record.__dict__.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+class SamplingFilter(Filter):
+    """
+    Sample low-severity records, consistently per request.
+
+    Records at WARNING and above are always kept. Otherwise, the sampling rate for a record
+    is that of the most specific matching logger name in `loggers`, else that of its level
+    in `levels`, else `rate`.
+
+    The keep/drop decision is derived from a hash of the record's context id (see `keys`),
+    so a request whose hash falls below a rate keeps all of its lines and any other request
+    keeps none. Records without a context id are sampled at random.
+
+    """
+    def __init__(self, rate=1.0, levels=None, loggers=None, keys=()):
+        super().__init__()
+        self.rate = rate
+        self.levels = {
+            getLevelName(level.upper()): level_rate
+            for level, level_rate in (levels or {}).items()
+            if level_rate is not None
+        }
+        self.loggers = sorted((loggers or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.keys = tuple(keys)
+        self.cache = {}
+
+    def filter(self, record):
+        if record.levelno >= WARNING or record.__dict__.get(UNFILTERED):
+            return True
+
+        key = record.name, record.levelno
+        try:
+            rate = self.cache[key]
+        except KeyError:
+            rate = self.cache[key] = self.resolve_rate(*key)
+
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        return self.sample(record) < rate
+
+    def resolve_rate(self, name, levelno):
+        for prefix, rate in self.loggers:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return self.levels.get(levelno, self.rate)
+
+    def sample(self, record):
+        """
+        Draw a record's sample, once per record so that every handler agrees on it.
+
+        """
+        try:
+            return record.__dict__[SAMPLE]
+        except KeyError:
+            pass
+
+        context_id = record_context_id(record, self.keys)
+        if context_id is None:
+            sample = random()
+        else:
+            sample = crc32(str(context_id).encode("utf-8")) / 2 ** 32
+        record.__dict__[SAMPLE] = sample
+        return sample
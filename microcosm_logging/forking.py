@@ -0,0 +1,105 @@
+"""
+Fork safety for preload-and-fork servers.
+
+Handlers configured before a fork (e.g. in a gunicorn master with `--preload`) would
+otherwise share buffers, connections and background threads with every forked worker.
+Fork hooks flush the parent's buffers before the fork, while holding each handler's lock
+so that no record can be buffered in between, and reset per-process state in the child.
+
+Handlers take part by implementing `before_fork()` and/or `after_fork_in_child()`;
+socket and logstash handlers reconnect in the child. Handler locks themselves are
+reinitialized in the child by the standard library.
+
+"""
+from logging import getLogger
+from logging.handlers import SocketHandler
+from sys import modules
+
+
+try:
+    from os import register_at_fork
+except ImportError:
+    # platforms that cannot fork (i.e. Windows)
+    register_at_fork = None
+
+
+_registered = False
+
+_locked_handlers = []
+
+
+def register_fork_hooks():
+    """
+    Register the fork hooks (once per process).
+
+    """
+    global _registered
+    if _registered or register_at_fork is None:
+        return
+
+    register_at_fork(
+        before=before_fork,
+        after_in_parent=after_fork_in_parent,
+        after_in_child=after_fork_in_child,
+    )
+    _registered = True
+
+
+def before_fork():
+    for handler in getLogger().handlers:
+        handler.acquire()
+        _locked_handlers.append(handler)
+        try:
+            handler.flush()
+            if hasattr(handler, "before_fork"):
+                handler.before_fork()
+        except Exception:
+            # never prevent a fork because a handler could not be flushed
+            pass
+
+
+def after_fork_in_parent():
+    while _locked_handlers:
+        _locked_handlers.pop().release()
+
+
+def after_fork_in_child():
+    # the child's locks were already reinitialized
+    _locked_handlers.clear()
+
+    for handler in getLogger().handlers:
+        reset_handler(handler)
+
+    reset_loggly_session()
+
+
+def reset_handler(handler):
+    """
+    Drop any state that the child must not share with its parent.
+
+    """
+    if hasattr(handler, "after_fork_in_child"):
+        handler.after_fork_in_child()
+    elif isinstance(handler, SocketHandler):
+        # reconnect on the next emit; dropping (not closing) the socket leaves the parent's connection open
+        handler.sock = None
+    elif hasattr(handler, "_transport"):
+        # likewise for the logstash handlers
+        handler._transport = None
+
+
+def reset_loggly_session():
+    """
+    The loggly handler posts through a module-level session and thread pool, which do not
+    survive a fork.
+
+    """
+    loggly_handlers = modules.get("loggly.handlers")
+    if loggly_handlers is None:
+        return
+
+    from requests_futures.sessions import FuturesSession
+
+    session = FuturesSession()
+    session.hooks["response"] = loggly_handlers.response_callback
+    loggly_handlers.session = session
@@ -1,6 +1,61 @@
+from datetime import datetime, timezone
+from functools import lru_cache
 from logging import Formatter
+from re import compile as re_compile
+from string import Formatter as TemplateParser
 
-from pythonjsonlogger.jsonlogger import merge_record_extra
+from logstash_async.formatter import LogstashFormatter as BaseLogstashFormatter
+from pythonjsonlogger.jsonlogger import JsonFormatter
+
+from microcosm_logging.framing import SCHEMA_VERSION, encode_frame, require_msgpack
+from microcosm_logging.limits import RecordLimits
+from microcosm_logging.records import extra_keys
+
+
+# how a template is substituted: not at all, with named brace-style fields, or by trying both styles
+PLAIN, BRACES, OTHER = "plain", "braces", "other"
+
+# the top-level name of a brace-style field, e.g. `foo` in `{foo.bar[0]}`
+FIELD_NAME = re_compile(r"[^.\[]*")
+
+
+def make_limits(limits):
+    return RecordLimits(**limits) if limits else None
+
+
+@lru_cache(maxsize=1024)
+def analyze_template(template):
+    """
+    Determine how `ExtraConsoleFormatter` substitutes fields into a (message) template
+    and which top-level fields it references.
+
+    Results are cached because most messages come from a small set of constant templates.
+
+    """
+    if "%" in template:
+        return OTHER, ()
+
+    if "{" not in template and "}" not in template:
+        return PLAIN, ()
+
+    try:
+        parsed = list(TemplateParser().parse(template))
+    except ValueError:
+        return OTHER, ()
+
+    fields = []
+    for _, field_name, format_spec, _ in parsed:
+        if field_name is None:
+            continue
+        if format_spec and "{" in format_spec:
+            return OTHER, ()
+        name = FIELD_NAME.match(field_name).group()
+        if not name or name.isdigit() or name.startswith("_"):
+            # positional and private fields are never substituted, so neither is anything else
+            return PLAIN, ()
+        fields.append(name)
+
+    return BRACES, tuple(dict.fromkeys(fields))
 
 
 class ExtraConsoleFormatter(Formatter):
@@ -17,28 +72,46 @@ class ExtraConsoleFormatter(Formatter):
     Besides having the ability to substitute values from `extra` into the message
     record, this formatter is consistent with the builtin logging.Formatter.
 
+    If `limits` are given, oversized extras and messages are truncated.
+
     """
 
-    def __init__(self, format_string):
+    def __init__(self, format_string, limits=None):
         self.format_string = format_string
+        self.limits = make_limits(limits)
 
     def format(self, record):
         message = record.getMessage()
 
-        extra = merge_record_extra(record=record, target=dict(), reserved=dict())
-        if not isinstance(record.msg, dict) and extra:
-            message = self.format_safely(message, **extra)
+        if not isinstance(record.msg, dict):
+            message = self.format_extra(message, record)
+
+        if self.limits:
+            message = self.limits.limit_message(message)
 
         if self.format_string.find("%(asctime)") >= 0:
             record.asctime = self.formatTime(record, self.datefmt)
 
-        log_string = self.format_safely(
-            self.format_string,
-            asctime=self.formatTime(record),
-            name=record.name,
-            levelname=record.levelname,
-            message=message
-        )
+        style, fields = analyze_template(self.format_string)
+        if style is BRACES:
+            log_string = self.format_fields(
+                self.format_string,
+                dict(
+                    # only format time if needed
+                    asctime=self.formatTime(record) if "asctime" in fields else None,
+                    name=record.name,
+                    levelname=record.levelname,
+                    message=message,
+                ),
+            )
+        else:
+            log_string = self.format_safely(
+                self.format_string,
+                asctime=self.formatTime(record),
+                name=record.name,
+                levelname=record.levelname,
+                message=message
+            )
 
         if record.exc_info:
             if log_string[-1] != "\n":
@@ -47,10 +120,49 @@ class ExtraConsoleFormatter(Formatter):
 
         return log_string
 
+    def format_extra(self, message, record):
+        """
+        Substitute values from `extra` (or any other record attribute) into the message.
+
+        Only the fields that a brace-style template references are looked up.
+
+        """
+        if record.args:
+            # interpolated messages vary too much to be worth caching
+            style, fields = analyze_template.__wrapped__(message)
+        else:
+            style, fields = analyze_template(message)
+
+        if style is PLAIN:
+            return message
+
+        if style is not BRACES:
+            # the referenced fields are only known once the template is applied
+            return self.format_mapping(message, RecordFields(record, self.limits))
+
+        try:
+            extra = {name: record.__dict__[name] for name in fields}
+        except KeyError:
+            return message
+
+        if self.limits:
+            extra = self.limits.limit_fields(extra)
+
+        return self.format_fields(message, extra)
+
+    def format_fields(self, s, fields):
+        try:
+            return s.format(**fields)
+        except (KeyError, IndexError):
+            return s
+
     def format_safely(self, s, **kwargs):
+        return self.format_mapping(s, kwargs)
+
+    def format_mapping(self, s, fields):
         # support old-style formatting
         try:
-            result = s % kwargs
+            result = s % fields
         except (KeyError, SyntaxError, TypeError, ValueError):
             pass
         else:
@@ -59,9 +171,124 @@ class ExtraConsoleFormatter(Formatter):
 
         # support new-style formatting
         try:
-            return s.format(**kwargs)
-        except (KeyError, IndexError):
+            return s.format_map(fields)
+        except (KeyError, IndexError, ValueError):
             pass
 
         # some messages will use '{' and '}' without meaning to use format strings
         return s
+
+
+class RecordFields(dict):
+    """
+    The (public) attributes of a record, looked up and limited only when a template
+    references them.
+
+    """
+
+    def __init__(self, record, limits=None):
+        super().__init__()
+        self.record = record
+        self.limits = limits
+
+    def __missing__(self, key):
+        if not isinstance(key, str) or key.startswith("_"):
+            raise KeyError(key)
+        value = self.record.__dict__[key]
+        if self.limits:
+            value = self.limits.limit_fields({key: value})[key]
+        self[key] = value
+        return value
+
+
+class JSONFormatter(JsonFormatter):
+    """
+    An extension of the pythonjsonlogger JsonFormatter which reads extras from the keys
+    tracked at record creation (see `microcosm_logging.records`) and, if `limits` are given,
+    truncates oversized fields before they are serialized.
+
+    """
+
+    def __init__(self, *args, limits=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limits = make_limits(limits)
+
+    def add_fields(self, log_record, record, message_dict):
+        for field in self._required_fields:
+            log_record[field] = record.__dict__.get(field)
+
+        log_record.update(self.static_fields)
+        log_record.update(message_dict)
+        for key in extra_keys(record):
+            if key not in self._skip_fields:
+                log_record[self.rename_fields.get(key, key)] = record.__dict__[key]
+
+        if self.timestamp:
+            key = self.timestamp if isinstance(self.timestamp, str) else "timestamp"
+            log_record[key] = datetime.fromtimestamp(record.created, tz=timezone.utc)
+
+        self._perform_rename_log_fields(log_record)
+
+    def process_log_record(self, log_record):
+        if self.limits:
+            return self.limits.limit_fields(log_record, message_key="message")
+        return log_record
+
+
+class LogstashFormatter(BaseLogstashFormatter):
+    """
+    An extension of the logstash-async LogstashFormatter which, if `limits` are given,
+    truncates oversized fields before they are serialized.
+
+    """
+
+    def __init__(self, *args, limits=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limits = make_limits(limits)
+
+    def _format_to_dict(self, record):
+        message = super()._format_to_dict(record)
+        if self.limits:
+            return self.limits.limit_fields(message, message_key=self.MessageSchema.MESSAGE)
+        return message
+
+
+class FramedFormatter(Formatter):
+    """
+    Formats records as length-prefixed msgpack frames (see `microcosm_logging.framing`)
+    instead of lines of text, for consumption by sidecar log collectors.
+
+    The payload schema is stable: the standard fields below, plus an `extra` map holding
+    any fields passed via `extra`. If `limits` are given, oversized fields are truncated.
+
+    """
+
+    def __init__(self, limits=None):
+        super().__init__()
+        require_msgpack()
+        self.limits = make_limits(limits)
+
+    def format(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        payload = {
+            "version": SCHEMA_VERSION,
+            "created": record.created,
+            "name": record.name,
+            "levelname": record.levelname,
+            "levelno": record.levelno,
+            "message": record.msg if isinstance(record.msg, dict) else record.getMessage(),
+            "pathname": record.pathname,
+            "lineno": record.lineno,
+            "funcName": record.funcName,
+            "process": record.process,
+            "thread": record.thread,
+            "exc_info": record.exc_text,
+            "stack_info": self.formatStack(record.stack_info) if record.stack_info else None,
+            "extra": {key: record.__dict__[key] for key in extra_keys(record)},
+        }
+        if self.limits:
+            payload = self.limits.limit_fields(payload, message_key="message")
+
+        return encode_frame(payload)
@@ -0,0 +1,53 @@
+"""
+Length-prefixed msgpack framing for sidecar log collectors.
+
+Each frame is a 4-byte big-endian payload length followed by a msgpack map. Unlike
+line-oriented JSON, framing is unambiguous even for multi-line messages and tracebacks.
+
+Requires the `msgpack` extra.
+
+"""
+from struct import Struct
+
+
+try:
+    from msgpack import packb, unpackb
+except ImportError:
+    packb = unpackb = None
+
+
+HEADER = Struct(">I")
+
+SCHEMA_VERSION = 1
+
+
+def require_msgpack():
+    if packb is None:
+        raise ImportError("Framed log output requires msgpack: pip install microcosm-logging[msgpack]")
+
+
+def encode_frame(payload):
+    data = packb(payload, default=str, use_bin_type=True)
+    return HEADER.pack(len(data)) + data
+
+
+def decode_frame(data):
+    """
+    Decode a single frame, including its header.
+
+    """
+    size, = HEADER.unpack_from(data)
+    return unpackb(data[HEADER.size:HEADER.size + size], raw=False)
+
+
+def read_frames(stream):
+    """
+    Yield decoded payloads from a binary stream until it is exhausted.
+
+    """
+    while True:
+        header = stream.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        size, = HEADER.unpack(header)
+        yield unpackb(stream.read(size), raw=False)
@@ -0,0 +1,395 @@
+"""
+Logging handlers.
+
+"""
+from asyncio import get_running_loop, shield
+from collections import OrderedDict, deque
+from logging import (
+    ERROR,
+    INFO,
+    Handler,
+    LogRecord,
+    StreamHandler,
+    getLevelName,
+    getLogger,
+)
+from logging.handlers import DatagramHandler, MemoryHandler, SocketHandler
+from threading import RLock
+from time import time
+
+from microcosm_logging.filters import UNFILTERED, RoutingFilter, record_context_id
+from microcosm_logging.formatters import FramedFormatter
+
+
+# the key that counts all records beyond the maximum number of counted keys
+OTHER = ("", "", "__other__")
+
+
+class AsyncioStreamHandler(StreamHandler):
+    """
+    A stream handler that never blocks a running event loop on its stream.
+
+    When called from a thread with a running event loop, records are formatted and
+    handed off to an in-memory buffer; a single writer task drains the buffer in
+    batches on the loop's default executor, so a slow stdout pipe only delays log
+    output instead of stalling every concurrent request.
+
+    Outside of an event loop, records are written synchronously (after any output that
+    is still buffered, to preserve ordering).
+
+    Services should `await handler.drain()` during loop shutdown; anything still
+    buffered when the handler is closed is written synchronously.
+
+    The event loop never waits on a lock that is held during a write: records are handed
+    off without the handler lock, and writes are serialized by a separate `write_lock`,
+    under which each batch is both taken and written, so that synchronous writes (from
+    threads without an event loop, or before a fork) cannot overtake the writer task's.
+
+    """
+    def __init__(self, stream=None, max_batch_size=1000):
+        super().__init__(stream)
+        self.max_batch_size = max_batch_size
+        self.buffer = deque()
+        self.writer = None
+        self.write_lock = RLock()
+
+    def handle(self, record):
+        # unlike `Handler.handle`, without the handler lock: the buffer is thread-safe and
+        # a synchronous writer holding the lock while it waits on `write_lock` would block the loop
+        result = self.filter(record)
+        if isinstance(result, LogRecord):
+            record = result
+        if result:
+            self.emit(record)
+        return result
+
+    def emit(self, record):
+        try:
+            loop = get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        try:
+            message = self.format(record) + self.terminator
+        except Exception:
+            self.handleError(record)
+            return
+
+        self.buffer.append((record, message))
+        if loop is None:
+            self.write_buffer()
+            return
+
+        # a writer cancelled before it started never clears itself
+        if self.writer is None or self.writer.done():
+            self.writer = loop.create_task(self.write_batches())
+
+    async def write_batches(self):
+        """
+        Drain the buffer on the loop's default executor, one batch at a time.
+
+        """
+        loop = get_running_loop()
+        try:
+            while self.buffer:
+                await loop.run_in_executor(None, self.write_batch)
+        finally:
+            self.writer = None
+
+    async def drain(self):
+        """
+        Wait until all buffered records have been written.
+
+        """
+        while self.writer is not None:
+            await shield(self.writer)
+
+    def take_batch(self):
+        batch = []
+        while self.buffer and len(batch) < self.max_batch_size:
+            batch.append(self.buffer.popleft())
+        return batch
+
+    def write_batch(self):
+        with self.write_lock:
+            self.write(self.take_batch())
+
+    def write_buffer(self):
+        with self.write_lock:
+            while self.buffer:
+                self.write(self.take_batch())
+
+    def write(self, batch):
+        if not batch:
+            return
+        try:
+            self.stream.write("".join(message for _, message in batch))
+            self.stream.flush()
+        except Exception:
+            self.handleError(batch[0][0])
+
+    def close(self):
+        self.write_buffer()
+        super().close()
+
+    def before_fork(self):
+        self.write_buffer()
+
+    def after_fork_in_child(self):
+        # the writer task belongs to the parent's event loop, and an executor thread may
+        # have held the write lock at the fork
+        self.buffer.clear()
+        self.writer = None
+        self.write_lock = RLock()
+
+
+class FramedStreamHandler(StreamHandler):
+    """
+    Write length-prefixed msgpack frames to a binary stream (e.g. stdout).
+
+    """
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self.setFormatter(FramedFormatter())
+
+    def emit(self, record):
+        try:
+            frame = self.format(record)
+            # text streams (such as `sys.stdout`) expose their underlying binary stream;
+            # flush any buffered text first so that it cannot end up inside a frame
+            stream = getattr(self.stream, "buffer", None)
+            if stream is None:
+                stream = self.stream
+            else:
+                self.stream.flush()
+            stream.write(frame)
+            stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class FramedSocketHandler(SocketHandler):
+    """
+    Write length-prefixed msgpack frames to a TCP or (if `port` is None) Unix socket.
+
+    """
+    def __init__(self, host, port=None):
+        super().__init__(host, port)
+        self.setFormatter(FramedFormatter())
+
+    def makePickle(self, record):
+        return self.format(record)
+
+
+class FramedDatagramHandler(DatagramHandler):
+    """
+    Send each record as a single length-prefixed msgpack frame to a UDP or (if `port`
+    is None) Unix datagram socket.
+
+    """
+    def __init__(self, host, port=None):
+        super().__init__(host, port)
+        self.setFormatter(FramedFormatter())
+
+    def makePickle(self, record):
+        return self.format(record)
+
+
+class CountingHandler(Handler):
+    """
+    Aggregate counts of records in memory, in place of high-volume log lines.
+
+    Records are counted per `(logger, level, message template)`; for each of `fields`,
+    the count, sum, min and max of numeric values passed via `extra` are aggregated too.
+    At most `max_keys` distinct keys are counted; the rest are counted together.
+
+    At most once per `interval` seconds (and on close), the aggregates are emitted as the
+    `counters` extra of a single summary record at `summary_level` and reset. The summary
+    is handled regardless of its logger's level and is never sampled or only counted.
+
+    """
+    def __init__(
+        self,
+        interval=60.0,
+        max_keys=1000,
+        fields=(),
+        logger_name="microcosm_logging.counters",
+        summary_level=INFO,
+    ):
+        super().__init__()
+        if isinstance(summary_level, str):
+            summary_level = getLevelName(summary_level)
+        self.interval = interval
+        self.max_keys = max_keys
+        self.fields = tuple(fields)
+        self.summary_logger = getLogger(logger_name)
+        self.summary_level = summary_level
+        self.counts = {}
+        self.aggregates = {}
+        self.last_summary_time = time()
+
+    def emit(self, record):
+        template = record.msg if isinstance(record.msg, str) else type(record.msg).__name__
+        key = record.name, record.levelname, template
+        if key not in self.counts and len(self.counts) >= self.max_keys:
+            key = OTHER
+
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+        for field in self.fields:
+            value = record.__dict__.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.aggregate(key, field, value)
+
+        # the summary is itself counted, but does not trigger another
+        if record.name != self.summary_logger.name and record.created - self.last_summary_time >= self.interval:
+            self.emit_summary()
+
+    def aggregate(self, key, field, value):
+        aggregate = self.aggregates.get((key, field))
+        if aggregate is None:
+            self.aggregates[key, field] = dict(count=1, sum=value, min=value, max=value)
+        else:
+            aggregate["count"] += 1
+            aggregate["sum"] += value
+            aggregate["min"] = min(aggregate["min"], value)
+            aggregate["max"] = max(aggregate["max"], value)
+
+    def summarize(self):
+        """
+        Take and reset the current aggregates.
+
+        """
+        counters = []
+        for key, count in self.counts.items():
+            name, levelname, template = key
+            counter = dict(logger=name, level=levelname, template=template, count=count)
+            fields = {
+                field: self.aggregates[key, field]
+                for field in self.fields
+                if (key, field) in self.aggregates
+            }
+            if fields:
+                counter.update(fields=fields)
+            counters.append(counter)
+
+        self.counts = {}
+        self.aggregates = {}
+        self.last_summary_time = time()
+        return counters
+
+    def emit_summary(self):
+        counters = self.summarize()
+        if not counters:
+            return
+        record = self.summary_logger.makeRecord(
+            self.summary_logger.name,
+            self.summary_level,
+            "",
+            0,
+            "Log counters.",
+            (),
+            None,
+            extra={"counters": counters, UNFILTERED: True},
+        )
+        self.summary_logger.handle(record)
+
+    def after_fork_in_child(self):
+        # the parent reports what it counted before the fork
+        self.summarize()
+
+    def close(self):
+        self.acquire()
+        try:
+            self.emit_summary()
+        finally:
+            self.release()
+        super().close()
+
+
+class FlightRecorderHandler(MemoryHandler):
+    """
+    Retain recent records per context that a target handler did not emit, and replay them
+    to the target when a record at or above `flushLevel` occurs in the same context.
+
+    Contexts (e.g. requests or tasks) are identified by the `keys` record attributes (see
+    `record_context_id`); records outside of any context are ignored. At most `capacity`
+    records are retained per context and at most `max_contexts` contexts are retained,
+    evicting the least recently used.
+
+    Records are retained unformatted, so nothing is rendered unless there is an error.
+    Records are retained if they are below the target's level or rejected by its other
+    filters (e.g. sampling); the target's routing by logger name applies to all of them.
+
+    """
+    def __init__(self, capacity=100, flushLevel=ERROR, target=None, max_contexts=1000, keys=()):
+        if isinstance(flushLevel, str):
+            flushLevel = getLevelName(flushLevel)
+        super().__init__(capacity, flushLevel=flushLevel, target=target, flushOnClose=False)
+        self.max_contexts = max_contexts
+        self.keys = tuple(keys)
+        self.contexts = OrderedDict()
+
+    def emit(self, record):
+        context_id = record_context_id(record, self.keys)
+        # records outside of any context have nothing to be replayed with
+        if context_id is None:
+            return
+
+        if record.levelno >= self.flushLevel:
+            records = self.contexts.pop(context_id, None)
+            if records:
+                self.replay(records)
+            return
+
+        if not self.is_missed_by_target(record):
+            return
+
+        records = self.contexts.get(context_id)
+        if records is None:
+            if len(self.contexts) >= self.max_contexts:
+                self.contexts.popitem(last=False)
+            records = self.contexts[context_id] = deque(maxlen=self.capacity)
+        else:
+            self.contexts.move_to_end(context_id)
+        records.append(record)
+
+    def is_missed_by_target(self, record):
+        """
+        Whether the target routes a record to itself, but does not emit it.
+
+        The recorder handles records before the target does (and the sampling filter
+        decides once per record), so the target's filters decide the same way here.
+
+        """
+        if self.target is None:
+            return True
+
+        routed = True
+        kept = record.levelno >= self.target.level
+        for target_filter in self.target.filters:
+            if isinstance(target_filter, RoutingFilter):
+                routed = routed and target_filter.filter(record)
+            elif kept:
+                kept = target_filter.filter(record)
+
+        return routed and not kept
+
+    def replay(self, records):
+        """
+        Emit retained records to the target, bypassing its filters.
+
+        """
+        if self.target is None:
+            return
+
+        self.target.acquire()
+        try:
+            for record in records:
+                self.target.emit(record)
+        finally:
+            self.target.release()
+
+    def after_fork_in_child(self):
+        # the parent replays its own contexts
+        self.contexts.clear()
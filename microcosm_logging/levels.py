@@ -4,6 +4,8 @@ Logging levels
 """
 from functools import total_ordering
 
+from microcosm_logging.decorators import refresh_fast_loggers
+
 
 @total_ordering
 class ConditionalLoggingLevel:
@@ -54,4 +56,5 @@ class ConditionalLoggingLevel:
         """
         # NB: set `logger.level` because loggers validate the type of the input to `logger.setLevel()`
         logger.level = level = cls(*args, **kwargs)
+        refresh_fast_loggers()
         return level
@@ -0,0 +1,164 @@
+"""
+Size limits for log records.
+
+Oversized messages and extras (a whole request body, a huge list) are cut off while
+walking the record, before it is serialized, rather than after paying to encode all of it.
+
+"""
+from collections import Counter
+from collections.abc import Mapping
+from itertools import islice
+
+
+TRUNCATION_MARKER = "...[truncated]"
+
+# the key under which a truncated mapping carries the truncation marker
+TRUNCATION_KEY = "..."
+
+# estimated encoded size of values that are not strings or collections
+SCALAR_SIZE = 8
+
+# the number of truncations by kind, shared by all formatters
+truncations = Counter()
+
+
+class RecordLimits:
+    """
+    Enforce size limits on a record's message and fields.
+
+    Every limit is optional:
+
+     - `max_message_length` caps the length of the message
+     - `max_field_length` caps the length of any string (or bytes) field value
+     - `max_collection_length` caps the number of items in any list, tuple, set or dict
+     - `max_depth` caps how deeply collections may nest
+     - `max_record_bytes` caps the (estimated) total size of all strings in the record;
+       fields beyond the budget are replaced by a truncation marker
+
+    """
+    def __init__(
+        self,
+        max_message_length=None,
+        max_field_length=None,
+        max_collection_length=None,
+        max_depth=None,
+        max_record_bytes=None,
+    ):
+        self.max_message_length = max_message_length
+        self.max_field_length = max_field_length
+        self.max_collection_length = max_collection_length
+        self.max_depth = max_depth
+        self.max_record_bytes = max_record_bytes
+
+    def limit_message(self, message):
+        return self.truncate(message, self.max_message_length, "message")
+
+    def limit_fields(self, fields, message_key=None):
+        """
+        Limit a dictionary of record fields, sharing a single budget across all of them.
+
+        If `message_key` is given, that field is limited as the message.
+
+        """
+        budget = Budget(self.max_record_bytes)
+        result = {}
+        for key, value in fields.items():
+            if budget.exhausted:
+                truncations["record"] += 1
+                result[key] = TRUNCATION_MARKER
+                continue
+            if key == message_key and isinstance(value, str):
+                value = self.limit_message(value)
+            result[key] = self.limit_value(value, budget, depth=0)
+        return result
+
+    def limit_value(self, value, budget, depth):
+        if isinstance(value, (str, bytes)):
+            return self.limit_string(value, budget)
+
+        if isinstance(value, Mapping):
+            if self.exceeds_depth(depth):
+                return TRUNCATION_MARKER
+            result = {}
+            for key, item in self.limit_items(value.items(), len(value)):
+                if budget.exhausted:
+                    truncations["record"] += 1
+                    break
+                result[key] = self.limit_value(item, budget, depth + 1)
+            if len(result) < len(value):
+                result[TRUNCATION_KEY] = TRUNCATION_MARKER
+            return result
+
+        if isinstance(value, (list, tuple, set, frozenset)):
+            if self.exceeds_depth(depth):
+                return TRUNCATION_MARKER
+            result = []
+            for item in self.limit_items(value, len(value)):
+                if budget.exhausted:
+                    truncations["record"] += 1
+                    break
+                result.append(self.limit_value(item, budget, depth + 1))
+            if len(result) < len(value):
+                result.append(TRUNCATION_MARKER)
+            return result
+
+        if value is None or isinstance(value, (bool, int, float)):
+            budget.spend(SCALAR_SIZE)
+            return value
+
+        # other objects are serialized as strings (e.g. via `default=str`); only those that
+        # exceed a limit are replaced by their (truncated) string
+        text = str(value)
+        limited = self.limit_string(text, budget)
+        return value if limited is text else limited
+
+    def limit_string(self, value, budget):
+        limit = self.max_field_length
+        if budget.remaining is not None and (limit is None or budget.remaining < limit):
+            limit = budget.remaining
+            kind = "record"
+        else:
+            kind = "field"
+
+        value = self.truncate(value, limit, kind)
+        budget.spend(len(value))
+        return value
+
+    def limit_items(self, items, length):
+        if self.max_collection_length is None or length <= self.max_collection_length:
+            return items
+        truncations["collection"] += 1
+        return islice(items, self.max_collection_length)
+
+    def exceeds_depth(self, depth):
+        if self.max_depth is None or depth < self.max_depth:
+            return False
+        truncations["depth"] += 1
+        return True
+
+    def truncate(self, value, limit, kind):
+        if limit is None or len(value) <= limit:
+            return value
+        truncations[kind] += 1
+        if isinstance(value, bytes):
+            return value[:limit] + TRUNCATION_MARKER.encode()
+        return value[:limit] + TRUNCATION_MARKER
+
+
+class Budget:
+    """
+    The remaining size budget for a single record.
+
+    """
+    __slots__ = ("remaining",)
+
+    def __init__(self, remaining):
+        self.remaining = remaining
+
+    @property
+    def exhausted(self):
+        return self.remaining is not None and self.remaining <= 0
+
+    def spend(self, size):
+        if self.remaining is not None:
+            self.remaining -= size
@@ -0,0 +1,196 @@
+"""
+Logging overhead profiling.
+
+Accounts for the time spent creating, formatting and emitting log records (and the
+number of bytes produced) per call site and per handler, so that expensive log
+statements can be found without attaching an external profiler.
+
+"""
+from atexit import register
+from collections import defaultdict
+from logging import getLogRecordFactory, setLogRecordFactory
+from random import random
+from sys import stderr
+from time import perf_counter
+
+from microcosm_logging.records import has_record_factory
+
+
+class ProfileStats:
+    """
+    Accumulated overhead for a single call site or handler.
+
+    """
+    __slots__ = ("count", "create_time", "format_time", "emit_time", "bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.create_time = 0.0
+        self.format_time = 0.0
+        self.emit_time = 0.0
+        self.bytes = 0
+
+    @property
+    def total_time(self):
+        return self.create_time + self.format_time + self.emit_time
+
+
+def call_site(record):
+    return record.name, "{}:{}".format(record.pathname, record.lineno)
+
+
+def encoded_size(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return len(str(value).encode("utf-8"))
+
+
+class LoggingProfiler:
+    """
+    Accounts for logging overhead per `(logger name, call site)` and per handler.
+
+    Record creation is measured by wrapping the log record factory; formatting and
+    emission are measured by wrapping each handler's `format` and `emit`. Emission
+    time excludes the time spent formatting.
+
+    Only a `sample_rate` fraction of records is accounted for; the decision is made
+    once per record so that all of its handlers agree.
+
+    """
+    def __init__(self, sample_rate=1.0, limit=20):
+        self.sample_rate = sample_rate
+        self.limit = limit
+        self.call_sites = defaultdict(ProfileStats)
+        self.handlers = defaultdict(ProfileStats)
+        self._registered_at_exit = False
+
+    def reset(self):
+        self.call_sites.clear()
+        self.handlers.clear()
+
+    def instrument(self, logger):
+        """
+        Instrument the record factory and all of a logger's handlers.
+
+        """
+        self.instrument_record_factory()
+        for handler in logger.handlers:
+            self.instrument_handler(handler)
+
+    def instrument_record_factory(self):
+        if has_record_factory(lambda factory: getattr(factory, "_logging_profiler", None) is self):
+            return
+        factory = getLogRecordFactory()
+
+        def apply(*args, **kwargs):
+            start_time = perf_counter()
+            record = factory(*args, **kwargs)
+            # an inner (re-installed) factory may already have accounted for this record
+            profilers = record.__dict__.get("_profilers", ())
+            if self in profilers:
+                return record
+
+            if self.sample_rate >= 1.0 or random() < self.sample_rate:
+                record._profilers = profilers + (self,)
+                stats = self.call_sites[call_site(record)]
+                stats.count += 1
+                stats.create_time += perf_counter() - start_time
+            return record
+
+        apply._logging_profiler = self
+        apply.__wrapped__ = factory
+        setLogRecordFactory(apply)
+
+    def instrument_handler(self, handler):
+        if getattr(handler, "_logging_profiler", None) is self:
+            return
+
+        name = handler.get_name() or type(handler).__name__
+        format_record = handler.format
+        emit_record = handler.emit
+
+        def profiled_format(record):
+            if self not in getattr(record, "_profilers", ()):
+                return format_record(record)
+
+            start_time = perf_counter()
+            result = format_record(record)
+            elapsed = perf_counter() - start_time
+            size = encoded_size(result)
+
+            record._profile_format_time = getattr(record, "_profile_format_time", 0.0) + elapsed
+            for stats in (self.call_sites[call_site(record)], self.handlers[name]):
+                stats.format_time += elapsed
+                stats.bytes += size
+            return result
+
+        def profiled_emit(record):
+            if self not in getattr(record, "_profilers", ()):
+                return emit_record(record)
+
+            record._profile_format_time = 0.0
+            start_time = perf_counter()
+            try:
+                emit_record(record)
+            finally:
+                elapsed = perf_counter() - start_time - record._profile_format_time
+                handler_stats = self.handlers[name]
+                handler_stats.count += 1
+                handler_stats.emit_time += elapsed
+                self.call_sites[call_site(record)].emit_time += elapsed
+
+        handler.format = profiled_format
+        handler.emit = profiled_emit
+        handler._logging_profiler = self
+
+    def report(self, limit=None):
+        """
+        Build a report of call sites and handlers, ranked by total time spent.
+
+        """
+        limit = self.limit if limit is None else limit
+        lines = []
+
+        lines.append("Logging profile by call site:")
+        for (name, site), stats in self._ranked(self.call_sites, limit):
+            lines.append(self._format_stats(stats, "{} ({})".format(name, site)))
+
+        lines.append("Logging profile by handler:")
+        for name, stats in self._ranked(self.handlers, limit):
+            lines.append(self._format_stats(stats, name))
+
+        return "\n".join(lines)
+
+    def dump(self, stream=None):
+        (stream or stderr).write(self.report() + "\n")
+
+    def dump_at_exit(self):
+        if self._registered_at_exit:
+            return
+        register(self.dump)
+        self._registered_at_exit = True
+
+    def _ranked(self, stats, limit):
+        return sorted(
+            stats.items(),
+            key=lambda item: item[1].total_time,
+            reverse=True,
+        )[:limit]
+
+    def _format_stats(self, stats, label):
+        return (
+            "  {total:10.3f}ms total - {create:.3f}ms create, {format:.3f}ms format, "
+            "{emit:.3f}ms emit - {count} records, {bytes} bytes - {label}"
+        ).format(
+            total=stats.total_time * 1000,
+            create=stats.create_time * 1000,
+            format=stats.format_time * 1000,
+            emit=stats.emit_time * 1000,
+            count=stats.count,
+            bytes=stats.bytes,
+            label=label,
+        )
+
+
+# the process-wide profiler used by `configure_logging`; handlers are process-wide too
+profiler = LoggingProfiler()
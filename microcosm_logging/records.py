@@ -0,0 +1,84 @@
+"""
+Extra field tracking for log records.
+
+`LogRecord.__init__` sets the standard attributes first, in a fixed order; anything after
+them, whether set by another log record factory or applied from `extra` by
+`Logger.makeRecord`, is an extra. Records created through the tracking factory are known
+to be laid out that way, so their extras are found without scanning all of their
+attributes against a reserved set.
+
+"""
+from itertools import islice
+from logging import LogRecord, getLogRecordFactory, setLogRecordFactory
+
+
+EXTRA_OFFSET = "_extra_offset"
+
+# attributes that formatters add to records after they are created
+FORMATTED_ATTRS = frozenset(("asctime", "message"))
+
+STANDARD_RECORD = LogRecord("", 0, "", 0, "", (), None)
+
+# the number of attributes that `LogRecord.__init__` sets, which precede all others
+STANDARD_COUNT = len(STANDARD_RECORD.__dict__)
+
+STANDARD_ATTRS = frozenset(STANDARD_RECORD.__dict__) | FORMATTED_ATTRS
+
+
+def extra_keys_factory(factory):
+    """
+    Wrap a log record factory to mark the records it creates as tracked.
+
+    """
+    def apply(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        record.__dict__[EXTRA_OFFSET] = STANDARD_COUNT
+        return record
+
+    apply._tracks_extra_keys = True
+    apply.__wrapped__ = factory
+    return apply
+
+
+def track_extra_keys():
+    if has_record_factory(lambda factory: getattr(factory, "_tracks_extra_keys", False)):
+        return
+
+    setLogRecordFactory(extra_keys_factory(getLogRecordFactory()))
+
+
+def has_record_factory(predicate):
+    """
+    Check whether any factory in the chain of log record factories matches.
+
+    Wrapping factories expose the factory they wrap as `__wrapped__`, so a wrapper that
+    is already installed anywhere in the chain is not installed again.
+
+    """
+    factory = getLogRecordFactory()
+    while factory is not None:
+        if predicate(factory):
+            return True
+        factory = getattr(factory, "__wrapped__", None)
+    return False
+
+
+def extra_keys(record):
+    """
+    List the names of a record's extra fields.
+
+    Records that were not created by a tracking factory (e.g. built directly or received
+    over a socket) fall back to a scan of all attributes.
+
+    """
+    offset = record.__dict__.get(EXTRA_OFFSET)
+    if offset is None:
+        keys = (key for key in record.__dict__ if key not in STANDARD_ATTRS)
+    else:
+        keys = islice(record.__dict__, offset, None)
+
+    return [
+        key
+        for key in keys
+        if not (isinstance(key, str) and (key.startswith("_") or key in FORMATTED_ATTRS))
+    ]
@@ -1,15 +1,28 @@
-from logging import getLogger
-from unittest.mock import Mock
+from logging import (
+    DEBUG,
+    INFO,
+    WARNING,
+    getLogger,
+)
+from unittest.mock import Mock, patch
 
 from hamcrest import (
     assert_that,
     calling,
     equal_to,
+    instance_of,
     is_,
     raises,
 )
 
-from microcosm_logging.decorators import context_logger, logger
+from microcosm_logging.decorators import (
+    FastLogger,
+    context_logger,
+    logger,
+    noop,
+    refresh_fast_loggers,
+)
+from microcosm_logging.levels import ConditionalLoggingLevel
 
 
 @logger
@@ -18,6 +31,12 @@ class TestClass:
     pass
 
 
+@logger(fast=True)
+class TestFastClass:
+
+    pass
+
+
 @logger
 class TestContextClass:
 
@@ -31,6 +50,81 @@ def test_using_class_logger_works():
     assert_that(instance.logger, is_(equal_to(getLogger(instance.__class__.__name__))))
 
 
+def test_using_fast_logger_works():
+    instance = TestFastClass()
+
+    assert_that(instance.logger, is_(instance_of(FastLogger)))
+    assert_that(instance.logger.logger, is_(equal_to(getLogger(instance.__class__.__name__))))
+    assert_that(instance.logger.name, is_(equal_to(instance.__class__.__name__)))
+
+
+def test_fast_logger_binds_disabled_levels_to_noop():
+    wrapped = getLogger("fast.levels")
+    wrapped.setLevel(INFO)
+    fast_logger = FastLogger(wrapped)
+
+    assert_that(fast_logger.debug, is_(equal_to(noop)))
+    assert_that(fast_logger.info, is_(equal_to(wrapped.info)))
+    assert_that(fast_logger.error, is_(equal_to(wrapped.error)))
+
+    with patch.object(wrapped, "handle") as handle:
+        fast_logger.debug("Skipped.")
+        fast_logger.info("Handled.")
+
+    assert_that(handle.call_count, is_(equal_to(1)))
+    assert_that(handle.call_args[0][0].getMessage(), is_(equal_to("Handled.")))
+
+
+def test_fast_logger_rebinds_on_refresh():
+    wrapped = getLogger("fast.refresh")
+    wrapped.setLevel(INFO)
+    fast_logger = FastLogger(wrapped)
+
+    wrapped.setLevel(DEBUG)
+    refresh_fast_loggers()
+    assert_that(fast_logger.debug, is_(equal_to(wrapped.debug)))
+
+    wrapped.setLevel(WARNING)
+    refresh_fast_loggers()
+    assert_that(fast_logger.info, is_(equal_to(noop)))
+
+
+def test_fast_logger_rebinds_on_set_level():
+    fast_logger = FastLogger(getLogger("fast.set_level"))
+
+    fast_logger.setLevel(WARNING)
+    assert_that(fast_logger.info, is_(equal_to(noop)))
+
+    fast_logger.setLevel(DEBUG)
+    assert_that(fast_logger.debug, is_(equal_to(fast_logger.logger.debug)))
+
+
+def test_fast_logger_checks_conditional_levels_on_every_call():
+    wrapped = getLogger("fast.conditional")
+    fast_logger = FastLogger(wrapped)
+
+    ConditionalLoggingLevel.setLevel(wrapped, DEBUG, WARNING, lambda: False)
+
+    assert_that(fast_logger.debug, is_(equal_to(wrapped.debug)))
+
+
+def test_fast_logger_delegates_without_getattr():
+    wrapped = getLogger("fast.delegates")
+    fast_logger = FastLogger(wrapped)
+
+    fast_logger.propagate = False
+
+    assert_that(hasattr(FastLogger, "__getattr__"), is_(equal_to(False)))
+    assert_that(fast_logger.name, is_(equal_to("fast.delegates")))
+    assert_that(wrapped.propagate, is_(equal_to(False)))
+    assert_that(fast_logger.getChild("child"), is_(equal_to(wrapped.getChild("child"))))
+
+    with patch.object(wrapped, "handle") as handle:
+        fast_logger.log(WARNING, "Handled.")
+
+    handle.assert_called_once()
+
+
 def test_using_context_logger_works():
     instance = TestContextClass()
     context_func = Mock(return_value={'some': 'context'})
@@ -1,8 +1,14 @@
+from contextlib import redirect_stdout
+from inspect import getclosurevars, isfunction
+from io import StringIO
 from logging import (
+    CRITICAL,
     DEBUG,
     INFO,
+    NOTSET,
     WARN,
     getLogger,
+    getLogRecordFactory,
 )
 from os import environ
 from unittest import TestCase
@@ -10,12 +16,25 @@ from unittest.mock import patch
 
 from hamcrest import (
     assert_that,
+    calling,
     contains_exactly,
+    contains_string,
     equal_to,
+    has_entries,
+    has_key,
+    has_length,
     is_,
+    is_not,
+    raises,
+    same_instance,
 )
 from microcosm.api import create_object_graph
 
+from microcosm_logging.decorators import FastLogger, noop
+from microcosm_logging.factories import make_dict_config
+from microcosm_logging.limits import TRUNCATION_MARKER
+from microcosm_logging.profiling import profiler
+
 
 class TestFactories(TestCase):
 
@@ -81,6 +100,30 @@ class TestFactories(TestCase):
         getLogger("foo").info("Foo should not be visible at info")
         getLogger("foo").warn("Foo should be visible at warn")
 
+    def test_configure_logging_rebinds_fast_loggers(self):
+        """
+        Fast loggers follow level overrides.
+
+        """
+        fast_logger = FastLogger(getLogger("fast"))
+
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    levels=dict(
+                        override=dict(
+                            warn=["fast"],
+                        )
+                    )
+                )
+            )
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        graph.use("logger")
+
+        assert_that(fast_logger.info, is_(equal_to(noop)))
+        assert_that(fast_logger.warning, is_(equal_to(getLogger("fast").warning)))
+
     def test_configure_logging_with_invalid_token(self):
         """
         Enabling loggly.
@@ -124,6 +167,511 @@ class TestFactories(TestCase):
             log_record = mocked_emit.call_args[0][0]
             assert_that(log_record.msg, is_(equal_to("Info will appear in logstash.")))
 
+    def test_configure_logging_with_framed_output(self):
+        """
+        Framed output to stdout replaces the console handler.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    framed=dict(
+                        enabled=True,
+                    ),
+                ),
+            )
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        dict_config = make_dict_config(graph)
+
+        assert_that(dict_config["handlers"], has_entries(
+            FramedHandler=has_entries(
+                formatter="FramedFormatter",
+            ),
+        ))
+        assert_that(dict_config["handlers"], is_not(has_key("console")))
+
+    def test_configure_logging_with_framed_unix_output_requires_path(self):
+        """
+        Framed output to a Unix socket needs a path.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    framed=dict(
+                        enabled=True,
+                        transport="unix",
+                    ),
+                ),
+            )
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+
+        assert_that(calling(make_dict_config).with_args(graph), raises(ValueError))
+
+    def test_configure_logging_with_limits(self):
+        """
+        Size limits are passed to the formatters.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    limits=dict(
+                        max_field_length=100,
+                    ),
+                    logstash=dict(
+                        enabled=True,
+                    ),
+                ),
+            )
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        dict_config = make_dict_config(graph)
+
+        assert_that(dict_config["formatters"], has_entries(
+            ExtraFormatter=has_entries(limits=dict(max_field_length=100)),
+            JSONFormatter=has_entries(limits=dict(max_field_length=100)),
+            LogstashFormatter=has_entries(limits=dict(max_field_length=100)),
+        ))
+        assert_that(dict_config["handlers"], has_entries(
+            LogstashHandler=has_entries(formatter="LogstashFormatter"),
+        ))
+
+        graph.use("logger")
+        console = next(handler for handler in getLogger().handlers if handler.name == "console")
+
+        with patch.object(console, "emit") as mocked_emit, \
+                patch("logstash_async.handler.SynchronousLogstashHandler.emit"):
+            graph.logger.info("Extras will be truncated: {foo}", extra=dict(foo="x" * 1000))
+
+        assert_that(
+            console.format(mocked_emit.call_args[0][0]),
+            contains_string("Extras will be truncated: {}{}".format("x" * 100, TRUNCATION_MARKER)),
+        )
+
+    def test_configure_logging_with_profile(self):
+        """
+        Logging overhead can be profiled.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    profile=dict(
+                        enabled=True,
+                        dump_at_exit=False,
+                    ),
+                ),
+            )
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        graph.use("logger")
+
+        profiler.reset()
+        graph.logger.info("Info will be profiled.")
+
+        assert_that(profiler.handlers["console"].count, is_(equal_to(1)))
+
+    def test_configure_logging_installs_record_factories_once(self):
+        """
+        Configuring several graphs does not keep wrapping the log record factory.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    profile=dict(
+                        enabled=True,
+                        dump_at_exit=False,
+                    ),
+                ),
+            )
+
+        def chain_length():
+            # every wrapping factory closes over the factory it wraps
+            factory, length = getLogRecordFactory(), 0
+            while isfunction(factory):
+                factory, length = getclosurevars(factory).nonlocals.get("factory"), length + 1
+            return length
+
+        create_object_graph(name="test", testing=True, loader=loader).use("logger")
+        length = chain_length()
+
+        for _ in range(3):
+            create_object_graph(name="test", testing=True, loader=loader).use("logger")
+
+        assert_that(chain_length(), is_(equal_to(length)))
+
+    def test_configure_logging_with_handler_levels_and_routing(self):
+        """
+        Handlers can use their own levels and route by logger name.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    stream_handler=dict(
+                        level="DEBUG",
+                    ),
+                    logstash=dict(
+                        enabled=True,
+                        level="WARNING",
+                        exclude=["noisy"],
+                    ),
+                )
+            )
+
+        with patch("logstash_async.handler.SynchronousLogstashHandler.emit") as mocked_emit:
+            graph = create_object_graph(name="test", loader=loader)
+            graph.use("logger")
+
+            assert_that(graph.logger.getEffectiveLevel(), is_(equal_to(DEBUG)))
+
+            graph.logger.info("Info will not appear in logstash.")
+            getLogger("noisy").warning("Noisy warnings will not appear in logstash.")
+            graph.logger.warning("Warnings will appear in logstash.")
+
+            assert_that(mocked_emit.call_count, is_(equal_to(1)))
+            log_record = mocked_emit.call_args[0][0]
+            assert_that(log_record.msg, is_(equal_to("Warnings will appear in logstash.")))
+
+    def test_configure_logging_with_sampling(self):
+        """
+        Low-severity records can be sampled before any handler formats them.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    logstash=dict(
+                        enabled=True,
+                    ),
+                    sampling=dict(
+                        enabled=True,
+                        levels=dict(
+                            info=0.0,
+                        ),
+                    ),
+                )
+            )
+
+        with patch("logstash_async.handler.SynchronousLogstashHandler.emit") as mocked_emit:
+            graph = create_object_graph(name="test", loader=loader)
+            graph.use("logger")
+
+            graph.logger.info("Info will be dropped.", extra=dict(request_id="foo"))
+            graph.logger.warning("Warnings will be kept.", extra=dict(request_id="foo"))
+
+            assert_that(mocked_emit.call_count, is_(equal_to(1)))
+
+    def test_configure_logging_with_counters(self):
+        """
+        Count-only templates are counted but not emitted.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    logstash=dict(
+                        enabled=True,
+                    ),
+                    counters=dict(
+                        enabled=True,
+                        count_only=["Cache miss."],
+                    ),
+                )
+            )
+
+        with patch("logstash_async.handler.SynchronousLogstashHandler.emit") as mocked_emit:
+            graph = create_object_graph(name="test", loader=loader)
+            graph.use("logger")
+
+            graph.logger.info("Cache miss.")
+            graph.logger.info("Cache miss.")
+
+            assert_that(mocked_emit.call_count, is_(equal_to(0)))
+
+        counting_handler = next(
+            handler
+            for handler in getLogger().handlers
+            if handler.get_name() == "Counters"
+        )
+        assert_that(counting_handler.summarize(), contains_exactly(
+            has_entries(logger="test", template="Cache miss.", count=2),
+        ))
+
+    def test_configure_logging_with_counters_above_info(self):
+        """
+        Counter summaries are emitted at (at least) the global level.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    level="WARNING",
+                    counters=dict(
+                        enabled=True,
+                        interval=0.0,
+                    ),
+                )
+            )
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        graph.use("logger")
+        console = next(handler for handler in getLogger().handlers if handler.name == "console")
+
+        with patch.object(console, "emit") as mocked_emit:
+            graph.logger.warning("Cache miss.")
+
+        summary = mocked_emit.call_args[0][0]
+        assert_that(summary.levelname, is_(equal_to("WARNING")))
+        assert_that(summary.counters, contains_exactly(
+            has_entries(logger="test", template="Cache miss.", count=1),
+        ))
+
+    def test_configure_logging_with_counters_and_handler_levels(self):
+        """
+        Counter summaries are emitted at (at least) every output handler's level.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    stream_handler=dict(
+                        level="WARNING",
+                    ),
+                    counters=dict(
+                        enabled=True,
+                        interval=0.0,
+                    ),
+                )
+            )
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        graph.use("logger")
+        console = next(handler for handler in getLogger().handlers if handler.name == "console")
+
+        with patch.object(console, "emit") as mocked_emit:
+            graph.logger.info("Cache miss.")
+
+        summary = mocked_emit.call_args[0][0]
+        assert_that(summary.levelname, is_(equal_to("WARNING")))
+        assert_that(summary.counters, contains_exactly(
+            has_entries(logger="test", template="Cache miss.", count=1),
+        ))
+
+    def test_configure_logging_with_flight_recorder(self):
+        """
+        Debug records are replayed when an error occurs in the same context.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    logstash=dict(
+                        enabled=True,
+                    ),
+                    flight_recorder=dict(
+                        enabled=True,
+                        target="LogstashHandler",
+                    ),
+                )
+            )
+
+        with patch("logstash_async.handler.SynchronousLogstashHandler.emit") as mocked_emit:
+            graph = create_object_graph(name="test", loader=loader)
+            graph.use("logger")
+
+            graph.logger.debug("Debug will be replayed.", extra=dict(request_id="A"))
+            graph.logger.info("Info will be emitted once.", extra=dict(request_id="A"))
+            graph.logger.debug("Debug from another request will not be replayed.", extra=dict(request_id="B"))
+            graph.logger.error("Error will be emitted.", extra=dict(request_id="A"))
+
+            assert_that(
+                [call[0][0].msg for call in mocked_emit.call_args_list],
+                contains_exactly(
+                    "Info will be emitted once.",
+                    "Debug will be replayed.",
+                    "Error will be emitted.",
+                ),
+            )
+
+    def test_configure_logging_with_flight_recorder_and_sampling(self):
+        """
+        Replayed records are not sampled again.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    logstash=dict(
+                        enabled=True,
+                    ),
+                    sampling=dict(
+                        enabled=True,
+                        levels=dict(
+                            debug=0.0,
+                            info=0.0,
+                        ),
+                    ),
+                    flight_recorder=dict(
+                        enabled=True,
+                        target="LogstashHandler",
+                    ),
+                )
+            )
+
+        with patch("logstash_async.handler.SynchronousLogstashHandler.emit") as mocked_emit:
+            graph = create_object_graph(name="test", loader=loader)
+            graph.use("logger")
+
+            graph.logger.debug("Debug will be replayed.", extra=dict(request_id="A"))
+            graph.logger.info("Sampled info will be replayed.", extra=dict(request_id="A"))
+            graph.logger.error("Error will be emitted.", extra=dict(request_id="A"))
+
+            assert_that(
+                [call[0][0].msg for call in mocked_emit.call_args_list],
+                contains_exactly(
+                    "Debug will be replayed.",
+                    "Sampled info will be replayed.",
+                    "Error will be emitted.",
+                ),
+            )
+
+    def test_configure_logging_with_flight_recorder_and_framed_output(self):
+        """
+        The flight recorder replays to framed output that replaces the console.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    framed=dict(
+                        enabled=True,
+                    ),
+                    flight_recorder=dict(
+                        enabled=True,
+                    ),
+                )
+            )
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        dict_config = make_dict_config(graph)
+
+        assert_that(dict_config["handlers"], has_entries(
+            FlightRecorder=has_entries(target="FramedHandler"),
+        ))
+
+    def test_configure_logging_reuses_handlers(self):
+        """
+        Identical configurations reuse the existing handlers.
+
+        """
+        graph = create_object_graph(name="test", testing=True)
+        graph.use("logger")
+        handlers = getLogger().handlers
+
+        graph = create_object_graph(name="test", testing=True)
+        graph.use("logger")
+
+        assert_that(getLogger().handlers, contains_exactly(*[same_instance(handler) for handler in handlers]))
+
+    def test_configure_logging_resets_levels_when_reusing_handlers(self):
+        """
+        Levels changed since the last configuration are reset, as by a full configuration.
+
+        """
+        graph = create_object_graph(name="test", testing=True)
+        graph.use("logger")
+        handlers = getLogger().handlers
+
+        getLogger().setLevel(CRITICAL)
+        getLogger("requests").setLevel(DEBUG)
+        getLogger("requests.child").setLevel(DEBUG)
+        handlers[0].setLevel(CRITICAL)
+
+        graph = create_object_graph(name="test", testing=True)
+        graph.use("logger")
+
+        assert_that(getLogger().handlers, contains_exactly(*[same_instance(handler) for handler in handlers]))
+        assert_that(getLogger().level, is_(equal_to(INFO)))
+        assert_that(getLogger("requests").level, is_(equal_to(WARN)))
+        assert_that(getLogger("requests.child").level, is_(equal_to(NOTSET)))
+        assert_that(handlers[0].level, is_(equal_to(INFO)))
+
+    def test_configure_logging_follows_redirected_stdout(self):
+        """
+        Identical configurations write to the current `sys.stdout`.
+
+        """
+        first, second = StringIO(), StringIO()
+
+        with redirect_stdout(first):
+            create_object_graph(name="test", testing=True).use("logger")
+        with redirect_stdout(second):
+            graph = create_object_graph(name="test", testing=True)
+            graph.use("logger")
+            graph.logger.info("Written to the second stream.")
+
+        assert_that(first.getvalue(), is_not(contains_string("Written to the second stream.")))
+        assert_that(second.getvalue(), contains_string("Written to the second stream."))
+
+    def test_configure_logging_applies_levels_incrementally(self):
+        """
+        Level changes are applied without recreating handlers.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    level="DEBUG",
+                )
+            )
+
+        graph = create_object_graph(name="test", testing=True)
+        graph.use("logger")
+        handlers = getLogger().handlers
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        graph.use("logger")
+
+        assert_that(getLogger().handlers, contains_exactly(*[same_instance(handler) for handler in handlers]))
+        assert_that(graph.logger.getEffectiveLevel(), is_(equal_to(DEBUG)))
+        assert_that(getLogger().handlers[0].level, is_(equal_to(DEBUG)))
+
+    def test_configure_logging_recreates_changed_handlers(self):
+        """
+        Handler changes, including those made outside of `configure_logging`, are reapplied.
+
+        """
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    stream_handler=dict(
+                        formatter="JSONFormatter",
+                    ),
+                )
+            )
+
+        graph = create_object_graph(name="test", testing=True)
+        graph.use("logger")
+        handler = getLogger().handlers[0]
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        graph.use("logger")
+
+        assert_that(getLogger().handlers[0], is_not(same_instance(handler)))
+
+        handler = getLogger().handlers[0]
+        getLogger().removeHandler(handler)
+
+        graph = create_object_graph(name="test", testing=True, loader=loader)
+        graph.use("logger")
+
+        assert_that(getLogger().handlers, has_length(1))
+
     def test_extra_and_exc_info(self):
         graph = create_object_graph(name="test", testing=True)
 
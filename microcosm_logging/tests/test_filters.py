@@ -0,0 +1,120 @@
+"""
+Logging filter tests.
+
+"""
+from logging import (
+    DEBUG,
+    ERROR,
+    INFO,
+    LogRecord,
+)
+
+from hamcrest import (
+    assert_that,
+    close_to,
+    equal_to,
+    is_,
+)
+
+from microcosm_logging.filters import CountOnlyFilter, RoutingFilter, SamplingFilter
+
+
+def make_record(name, level=INFO, **extra):
+    record = LogRecord(name, level, "some_function", 42, "A sample log.", None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_routing_filter_passes_everything_by_default():
+    routing_filter = RoutingFilter()
+
+    assert_that(routing_filter.filter(make_record("foo")), is_(equal_to(True)))
+
+
+def test_routing_filter_excludes_descendants():
+    routing_filter = RoutingFilter(exclude=["foo"])
+
+    assert_that(routing_filter.filter(make_record("foo")), is_(equal_to(False)))
+    assert_that(routing_filter.filter(make_record("foo.bar")), is_(equal_to(False)))
+    assert_that(routing_filter.filter(make_record("foobar")), is_(equal_to(True)))
+
+
+def test_routing_filter_most_specific_name_wins():
+    routing_filter = RoutingFilter(include=["foo", "foo.bar.baz"], exclude=["foo.bar"])
+
+    assert_that(routing_filter.filter(make_record("foo.qux")), is_(equal_to(True)))
+    assert_that(routing_filter.filter(make_record("foo.bar.qux")), is_(equal_to(False)))
+    assert_that(routing_filter.filter(make_record("foo.bar.baz.qux")), is_(equal_to(True)))
+    assert_that(routing_filter.filter(make_record("bar")), is_(equal_to(False)))
+
+
+def test_routing_filter_caches_decisions():
+    routing_filter = RoutingFilter(exclude=["foo"])
+
+    routing_filter.filter(make_record("foo.bar"))
+
+    assert_that(routing_filter.cache, is_(equal_to({"foo.bar": False})))
+
+
+def test_count_only_filter():
+    count_only_filter = CountOnlyFilter(templates=["A sample log."])
+
+    assert_that(count_only_filter.filter(make_record("foo")), is_(equal_to(False)))
+
+
+def test_sampling_filter_keeps_warnings_and_above():
+    sampling_filter = SamplingFilter(rate=0.0)
+
+    assert_that(sampling_filter.filter(make_record("foo", INFO)), is_(equal_to(False)))
+    assert_that(sampling_filter.filter(make_record("foo", ERROR)), is_(equal_to(True)))
+
+
+def test_filters_keep_unfiltered_records():
+    record = make_record("foo", INFO, _unfiltered=True)
+
+    assert_that(CountOnlyFilter(templates=["A sample log."]).filter(record), is_(equal_to(True)))
+    assert_that(SamplingFilter(rate=0.0).filter(record), is_(equal_to(True)))
+
+
+def test_sampling_filter_is_consistent_per_request():
+    sampling_filter = SamplingFilter(rate=0.5, keys=["request_id"])
+
+    for index in range(100):
+        decisions = {
+            sampling_filter.filter(make_record(name, level, request_id=index))
+            for name in ("foo", "bar")
+            for level in (DEBUG, INFO)
+        }
+        assert_that(len(decisions), is_(equal_to(1)))
+
+
+def test_sampling_filter_is_consistent_per_record():
+    console_filter = SamplingFilter(rate=0.5)
+    loggly_filter = SamplingFilter(rate=0.5)
+
+    for index in range(100):
+        record = make_record("foo")
+        assert_that(console_filter.filter(record), is_(equal_to(loggly_filter.filter(record))))
+
+
+def test_sampling_filter_rate():
+    sampling_filter = SamplingFilter(rate=0.25, keys=["request_id"])
+
+    kept = [
+        sampling_filter.filter(make_record("foo", request_id=index))
+        for index in range(10000)
+    ]
+    assert_that(sum(kept) / len(kept), is_(close_to(0.25, 0.02)))
+
+
+def test_sampling_filter_rates_by_logger_and_level():
+    sampling_filter = SamplingFilter(
+        rate=0.0,
+        levels=dict(info=1.0),
+        loggers={"foo": 0.0, "foo.bar": 1.0},
+    )
+
+    assert_that(sampling_filter.filter(make_record("baz", INFO)), is_(equal_to(True)))
+    assert_that(sampling_filter.filter(make_record("baz", DEBUG)), is_(equal_to(False)))
+    assert_that(sampling_filter.filter(make_record("foo", INFO)), is_(equal_to(False)))
+    assert_that(sampling_filter.filter(make_record("foo.bar.baz", DEBUG)), is_(equal_to(True)))
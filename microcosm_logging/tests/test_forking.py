@@ -0,0 +1,265 @@
+"""
+Fork safety tests.
+
+"""
+from asyncio import run
+from collections import Counter
+from io import BytesIO
+from logging import (
+    DEBUG,
+    FileHandler,
+    Formatter,
+    LogRecord,
+    getLogger,
+)
+from logging.handlers import MemoryHandler
+from os import _exit, fork, waitpid
+from os.path import join
+from socket import (
+    AF_INET,
+    AF_UNIX,
+    SOCK_STREAM,
+    socket,
+)
+from tempfile import NamedTemporaryFile, mkdtemp
+from threading import Event, Thread
+from time import sleep, time
+from unittest import TestCase
+from unittest.mock import patch
+
+import loggly.handlers
+from hamcrest import (
+    assert_that,
+    contains_exactly,
+    equal_to,
+    greater_than,
+    has_item,
+    is_,
+)
+from microcosm.api import create_object_graph
+
+from microcosm_logging import forking
+from microcosm_logging.forking import register_fork_hooks
+from microcosm_logging.framing import read_frames
+from microcosm_logging.handlers import AsyncioStreamHandler
+
+
+def test_fork_hooks_are_skipped_where_processes_cannot_fork():
+    with patch("microcosm_logging.forking._registered", False), \
+            patch("microcosm_logging.forking.register_at_fork", None):
+        register_fork_hooks()
+
+        assert_that(forking._registered, is_(equal_to(False)))
+
+
+class TestForking(TestCase):
+
+    def setUp(self):
+        register_fork_hooks()
+
+        self.path = NamedTemporaryFile(suffix=".log", delete=False).name
+        self.target = FileHandler(self.path)
+        self.target.setFormatter(Formatter("%(message)s"))
+        # buffer records so that unflushed records would be duplicated by a fork
+        self.handler = MemoryHandler(capacity=100000, flushLevel=100, target=self.target)
+
+        self.root = getLogger()
+        self.root_level = self.root.level
+        self.root.setLevel(DEBUG)
+        self.root.addHandler(self.handler)
+        self.logger = getLogger("forking")
+
+    def tearDown(self):
+        self.root.removeHandler(self.handler)
+        self.root.setLevel(self.root_level)
+        self.handler.close()
+        self.target.close()
+
+    def read_lines(self):
+        with open(self.path) as infile:
+            return Counter(infile.read().splitlines())
+
+    def test_fork_under_load(self):
+        stopped = Event()
+
+        def log_continuously():
+            index = 0
+            while not stopped.is_set():
+                self.logger.debug("thread-%s", index)
+                index += 1
+
+        thread = Thread(target=log_continuously)
+        thread.start()
+
+        try:
+            for index in range(10):
+                self.logger.debug("parent-before-%s", index)
+
+            pid = fork()
+            if pid == 0:
+                for index in range(10):
+                    self.logger.debug("child-%s", index)
+                self.handler.flush()
+                _exit(0)
+
+            _, status = waitpid(pid, 0)
+            assert_that(status, is_(equal_to(0)))
+
+            for index in range(10):
+                self.logger.debug("parent-after-%s", index)
+        finally:
+            stopped.set()
+            thread.join()
+
+        self.handler.flush()
+        lines = self.read_lines()
+
+        # nothing is lost and nothing is written twice
+        for prefix in ("parent-before", "child", "parent-after"):
+            for index in range(10):
+                assert_that(lines["{}-{}".format(prefix, index)], is_(equal_to(1)))
+
+        thread_lines = [line for line in lines if line.startswith("thread-")]
+        assert_that(len(thread_lines), is_(greater_than(0)))
+        assert_that(max(lines[line] for line in thread_lines), is_(equal_to(1)))
+
+
+class Server:
+    """
+    Collect everything sent to a listening socket, one entry per connection.
+
+    """
+    def __init__(self, family, address):
+        self.listener = socket(family, SOCK_STREAM)
+        self.listener.bind(address)
+        self.listener.listen()
+        self.address = self.listener.getsockname()
+        self.connections = []
+        Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return
+            data = bytearray()
+            self.connections.append(data)
+            Thread(target=self.receive, args=(connection, data), daemon=True).start()
+
+    def receive(self, connection, data):
+        with connection:
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    return
+                data.extend(chunk)
+
+    def wait_for(self, text):
+        deadline = time() + 5.0
+        while time() < deadline:
+            if any(text.encode() in data for data in self.connections):
+                return
+            sleep(0.01)
+
+    def close(self):
+        self.listener.close()
+
+
+class TestForkingConfiguredHandlers(TestCase):
+
+    def setUp(self):
+        self.logstash_server = Server(AF_INET, ("127.0.0.1", 0))
+        self.framed_server = Server(AF_UNIX, join(mkdtemp(), "framed.sock"))
+
+        def loader(metadata):
+            return dict(
+                logging=dict(
+                    framed=dict(
+                        enabled=True,
+                        transport="unix",
+                        path=self.framed_server.address,
+                    ),
+                    logstash=dict(
+                        enabled=True,
+                        host=self.logstash_server.address[0],
+                        port=self.logstash_server.address[1],
+                    ),
+                ),
+            )
+
+        self.graph = create_object_graph(name="test", testing=True, loader=loader)
+        self.graph.use("logger")
+        self.handlers = {handler.name: handler for handler in getLogger().handlers}
+
+    def tearDown(self):
+        self.logstash_server.close()
+        self.framed_server.close()
+        # replace the handlers for the closed servers
+        create_object_graph(name="test", testing=True).use("logger")
+
+    def test_socket_handlers_reconnect_in_child(self):
+        self.graph.logger.info("parent")
+        self.framed_server.wait_for("parent")
+        session = loggly.handlers.session
+
+        pid = fork()
+        if pid == 0:
+            reset = (
+                self.handlers["FramedHandler"].sock is None
+                and self.handlers["LogstashHandler"]._transport is None
+                and loggly.handlers.session is not session
+            )
+            self.graph.logger.info("child")
+            _exit(0 if reset else 1)
+
+        _, status = waitpid(pid, 0)
+        assert_that(status, is_(equal_to(0)))
+
+        self.framed_server.wait_for("child")
+        self.logstash_server.wait_for("child")
+
+        # the child wrote over its own connection, not the parent's
+        assert_that(
+            [
+                [payload["message"] for payload in read_frames(BytesIO(data))]
+                for data in self.framed_server.connections
+            ],
+            contains_exactly(["parent"], ["child"]),
+        )
+        assert_that(
+            [b"child" in data for data in self.logstash_server.connections],
+            has_item(True),
+        )
+
+
+class TestForkingAsyncioHandler(TestCase):
+
+    def setUp(self):
+        register_fork_hooks()
+        self.handler = AsyncioStreamHandler(NamedTemporaryFile("w+", suffix=".log"))
+        getLogger().addHandler(self.handler)
+
+    def tearDown(self):
+        getLogger().removeHandler(self.handler)
+        self.handler.close()
+
+    def test_buffer_is_written_once(self):
+        async def log_and_fork():
+            for index in range(3):
+                self.handler.handle(LogRecord("forking", DEBUG, "", 0, str(index), None, None))
+
+            pid = fork()
+            if pid == 0:
+                # anything left in the child's buffer would be written again here
+                self.handler.close()
+                _exit(0)
+
+            _, status = waitpid(pid, 0)
+            assert_that(status, is_(equal_to(0)))
+            await self.handler.drain()
+
+        run(log_and_fork())
+
+        self.handler.stream.seek(0)
+        assert_that(self.handler.stream.read(), is_(equal_to("0\n1\n2\n")))
@@ -1,8 +1,27 @@
+from json import loads
 from logging import INFO, LogRecord
-
-from hamcrest import assert_that, equal_to, is_
-
-from microcosm_logging.formatters import ExtraConsoleFormatter
+from sys import exc_info
+
+from hamcrest import (
+    assert_that,
+    contains_string,
+    equal_to,
+    has_entries,
+    is_,
+)
+
+from microcosm_logging.formatters import (
+    BRACES,
+    OTHER,
+    PLAIN,
+    ExtraConsoleFormatter,
+    FramedFormatter,
+    JSONFormatter,
+    LogstashFormatter,
+    analyze_template,
+)
+from microcosm_logging.framing import decode_frame
+from microcosm_logging.limits import TRUNCATION_MARKER
 
 
 def test_extra_formatter_formats_simple_log():
@@ -140,3 +159,142 @@ def test_extra_formatter_ignores_malformed_old_format():
 
     log_result = formatter.format(log_record)
     assert_that(log_result, is_(equal_to(str(log_message))))
+
+
+def test_extra_formatter_escapes_braces():
+    format_string = "{message}"
+    formatter = ExtraConsoleFormatter(format_string)
+
+    log_record = LogRecord('name', INFO, 'some_function', 42, "{{literal}} {foo}", None, 0)
+    log_record.foo = "bar"
+
+    log_result = formatter.format(log_record)
+    assert_that(log_result, is_(equal_to("{literal} bar")))
+
+
+def test_analyze_template():
+    assert_that(analyze_template("A sample log."), is_(equal_to((PLAIN, ()))))
+    assert_that(analyze_template("{} and {foo}"), is_(equal_to((PLAIN, ()))))
+    assert_that(analyze_template("{foo.bar} {baz[0]!r:>10} {foo}"), is_(equal_to((BRACES, ("foo", "baz")))))
+    assert_that(analyze_template("%(foo)s {bar}"), is_(equal_to((OTHER, ()))))
+    assert_that(analyze_template("{foo:{width}}"), is_(equal_to((OTHER, ()))))
+
+
+def test_extra_formatter_caches_template_analysis():
+    format_string = "{message}"
+    formatter = ExtraConsoleFormatter(format_string)
+    analyze_template.cache_clear()
+
+    for value in ("bar", "baz"):
+        log_record = LogRecord('name', INFO, 'some_function', 42, "A cached log with extra: {foo}.", None, 0)
+        log_record.foo = value
+        formatter.format(log_record)
+
+    # one miss for the message template and one for the format string
+    assert_that(analyze_template.cache_info().misses, is_(equal_to(2)))
+    assert_that(analyze_template.cache_info().hits, is_(equal_to(2)))
+
+
+def test_extra_formatter_truncates_with_limits():
+    format_string = "{message}"
+    formatter = ExtraConsoleFormatter(format_string, limits=dict(max_field_length=3, max_message_length=10))
+
+    log_record = LogRecord(
+        'name',
+        INFO,
+        'some_function',
+        42,
+        "A sample log with extra: {foo}.",
+        None,
+        None
+    )
+    log_record.foo = "barbaz"
+
+    log_result = formatter.format(log_record)
+    assert_that(log_result, is_(equal_to("A sample l" + TRUNCATION_MARKER)))
+
+
+def test_extra_formatter_looks_up_old_style_fields_lazily():
+    formatter = ExtraConsoleFormatter("%(message)s", limits=dict(max_field_length=3))
+
+    log_record = LogRecord('name', INFO, 'some_function', 42, "A %(foo)s log from %(name)s.", None, None)
+    log_record.foo = "barbaz"
+
+    log_result = formatter.format(log_record)
+    assert_that(log_result, is_(equal_to("A bar" + TRUNCATION_MARKER + " log from nam" + TRUNCATION_MARKER + ".")))
+
+
+def test_json_formatter_truncates_with_limits():
+    formatter = JSONFormatter("%(message)s", limits=dict(max_collection_length=1))
+
+    log_record = LogRecord('name', INFO, 'some_function', 42, "A sample log.", None, None)
+    log_record.foo = list(range(1000))
+
+    log_result = loads(formatter.format(log_record))
+    assert_that(log_result, is_(equal_to(dict(message="A sample log.", foo=[0, TRUNCATION_MARKER]))))
+
+
+def test_json_formatter_truncates_oversized_objects():
+    class Oversized:
+        def __str__(self):
+            return "x" * 1000
+
+    formatter = JSONFormatter("%(message)s", limits=dict(max_field_length=3))
+
+    log_record = LogRecord('name', INFO, 'some_function', 42, "A sample log.", None, None)
+    log_record.foo = Oversized()
+
+    log_result = loads(formatter.format(log_record))
+    assert_that(log_result, has_entries(foo="xxx" + TRUNCATION_MARKER))
+
+
+def test_logstash_formatter_truncates_with_limits():
+    formatter = LogstashFormatter(limits=dict(max_field_length=3))
+
+    log_record = LogRecord('name', INFO, 'some_function', 42, "A sample log.", None, None)
+    log_record.foo = "barbaz"
+
+    log_result = loads(formatter.format(log_record))
+    assert_that(log_result, has_entries(
+        message="A s" + TRUNCATION_MARKER,
+        extra=has_entries(foo="bar" + TRUNCATION_MARKER),
+    ))
+
+
+def test_framed_formatter_encodes_record():
+    formatter = FramedFormatter()
+
+    log_record = LogRecord(
+        'name',
+        INFO,
+        'some_function',
+        42,
+        "A sample log with old string %s.",
+        ("bar",),
+        None
+    )
+    log_record.foo = "baz"
+
+    payload = decode_frame(formatter.format(log_record))
+    assert_that(payload, has_entries(
+        version=1,
+        name="name",
+        levelname="INFO",
+        message="A sample log with old string bar.",
+        lineno=42,
+        exc_info=None,
+        extra=dict(foo="baz"),
+    ))
+
+
+def test_framed_formatter_keeps_tracebacks_in_one_frame():
+    formatter = FramedFormatter()
+
+    try:
+        raise Exception("error")
+    except Exception:
+        log_record = LogRecord('name', INFO, 'some_function', 42, "Failed.", None, exc_info())
+
+    payload = decode_frame(formatter.format(log_record))
+    assert_that(payload["message"], is_(equal_to("Failed.")))
+    assert_that(payload["exc_info"], contains_string("Traceback"))
@@ -0,0 +1,301 @@
+"""
+Logging handler tests.
+
+"""
+from asyncio import run, sleep as asyncio_sleep
+from io import BytesIO, StringIO, TextIOWrapper
+from logging import (
+    DEBUG,
+    ERROR,
+    INFO,
+    LogRecord,
+    getLogger,
+)
+from socket import AF_INET, SOCK_DGRAM, socket
+from threading import Event, Thread
+from time import perf_counter, sleep
+from unittest.mock import MagicMock, patch
+
+from hamcrest import (
+    assert_that,
+    contains_exactly,
+    equal_to,
+    has_entries,
+    is_,
+    less_than,
+    none,
+)
+
+from microcosm_logging.filters import RoutingFilter, SamplingFilter
+from microcosm_logging.framing import decode_frame, read_frames
+from microcosm_logging.handlers import (
+    OTHER,
+    AsyncioStreamHandler,
+    CountingHandler,
+    FlightRecorderHandler,
+    FramedDatagramHandler,
+    FramedStreamHandler,
+)
+
+
+def make_record(message, name="name", level=INFO, **extra):
+    record = LogRecord(name, level, "some_function", 42, message, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_asyncio_handler_writes_synchronously_outside_loop():
+    stream = StringIO()
+    handler = AsyncioStreamHandler(stream)
+
+    handler.handle(make_record("foo"))
+
+    assert_that(stream.getvalue(), is_(equal_to("foo\n")))
+    assert_that(handler.writer, is_(none()))
+
+
+def test_asyncio_handler_hands_off_on_running_loop():
+    stream = StringIO()
+    handler = AsyncioStreamHandler(stream, max_batch_size=2)
+
+    async def log():
+        for index in range(5):
+            handler.handle(make_record(str(index)))
+        # nothing is written until the loop gets control back
+        assert_that(stream.getvalue(), is_(equal_to("")))
+        await handler.drain()
+
+    run(log())
+
+    assert_that(stream.getvalue(), is_(equal_to("0\n1\n2\n3\n4\n")))
+    assert_that(handler.writer, is_(none()))
+
+
+def test_asyncio_handler_writes_buffer_on_close():
+    stream = StringIO()
+    handler = AsyncioStreamHandler(stream)
+
+    async def log():
+        handler.handle(make_record("foo"))
+        handler.writer.cancel()
+
+    run(log())
+    handler.close()
+
+    assert_that(stream.getvalue(), is_(equal_to("foo\n")))
+
+
+def test_asyncio_handler_preserves_order_across_threads():
+    writing = Event()
+
+    class SlowStream(StringIO):
+        def write(self, text):
+            if not writing.is_set():
+                writing.set()
+                sleep(0.1)
+            return super().write(text)
+
+    stream = SlowStream()
+    handler = AsyncioStreamHandler(stream, max_batch_size=1)
+
+    def log_synchronously():
+        # while the writer task is writing its first batch
+        writing.wait()
+        handler.handle(make_record("3"))
+
+    async def log():
+        for index in range(3):
+            handler.handle(make_record(str(index)))
+        thread = Thread(target=log_synchronously)
+        thread.start()
+        await handler.drain()
+        thread.join()
+
+    run(log())
+
+    assert_that(stream.getvalue(), is_(equal_to("0\n1\n2\n3\n")))
+
+
+def test_asyncio_handler_never_blocks_loop_on_write():
+    writing = Event()
+
+    class SlowStream(StringIO):
+        def write(self, text):
+            writing.set()
+            sleep(0.5)
+            return super().write(text)
+
+    handler = AsyncioStreamHandler(SlowStream())
+    handler.setLevel(INFO)
+
+    async def log():
+        handler.handle(make_record("foo"))
+        while not writing.is_set():
+            await asyncio_sleep(0.01)
+
+        # while the first write is in flight
+        start_time = perf_counter()
+        handler.handle(make_record("bar"))
+        elapsed_time = perf_counter() - start_time
+
+        await handler.drain()
+        return elapsed_time
+
+    assert_that(run(log()), is_(less_than(0.05)))
+    assert_that(handler.stream.getvalue(), is_(equal_to("foo\nbar\n")))
+
+
+def test_framed_stream_handler_writes_binary_frames():
+    buffer = BytesIO()
+    handler = FramedStreamHandler(TextIOWrapper(buffer))
+
+    handler.handle(make_record("foo\nbar"))
+    handler.handle(make_record("baz"))
+
+    buffer.seek(0)
+    assert_that(
+        [payload["message"] for payload in read_frames(buffer)],
+        contains_exactly("foo\nbar", "baz"),
+    )
+
+
+def test_framed_stream_handler_flushes_buffered_text_first():
+    buffer = BytesIO()
+    stream = TextIOWrapper(buffer)
+    handler = FramedStreamHandler(stream)
+
+    stream.write("text")
+    handler.handle(make_record("foo"))
+
+    assert_that(buffer.getvalue()[:4], is_(equal_to(b"text")))
+    assert_that(decode_frame(buffer.getvalue()[4:]), has_entries(message="foo"))
+
+
+def test_framed_datagram_handler_sends_one_frame_per_datagram():
+    receiver = socket(AF_INET, SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    handler = FramedDatagramHandler(*receiver.getsockname())
+
+    try:
+        handler.handle(make_record("foo"))
+        payload = decode_frame(receiver.recv(65536))
+    finally:
+        handler.close()
+        receiver.close()
+
+    assert_that(payload, has_entries(message="foo", levelname="INFO"))
+
+
+def test_counting_handler_aggregates_counts_and_fields():
+    handler = CountingHandler(fields=["elapsed_time"])
+
+    handler.handle(make_record("Cache miss.", elapsed_time=1.0))
+    handler.handle(make_record("Cache miss.", elapsed_time=3.0))
+    handler.handle(make_record("Retrying.", elapsed_time="not a number"))
+
+    assert_that(handler.summarize(), contains_exactly(
+        dict(
+            logger="name",
+            level="INFO",
+            template="Cache miss.",
+            count=2,
+            fields=dict(elapsed_time=dict(count=2, sum=4.0, min=1.0, max=3.0)),
+        ),
+        dict(logger="name", level="INFO", template="Retrying.", count=1),
+    ))
+    assert_that(handler.summarize(), is_(equal_to([])))
+
+
+def test_counting_handler_bounds_cardinality():
+    handler = CountingHandler(max_keys=1)
+
+    handler.handle(make_record("foo"))
+    handler.handle(make_record("bar"))
+    handler.handle(make_record("baz"))
+
+    assert_that(handler.counts, is_(equal_to({
+        ("name", "INFO", "foo"): 1,
+        OTHER: 2,
+    })))
+
+
+def test_counting_handler_emits_summary_periodically():
+    handler = CountingHandler(interval=60.0)
+
+    with patch.object(getLogger("microcosm_logging.counters"), "handle") as mocked_handle:
+        handler.handle(make_record("foo"))
+        assert_that(mocked_handle.call_count, is_(equal_to(0)))
+
+        record = make_record("foo")
+        record.created += 60.0
+        handler.handle(record)
+
+    summary = mocked_handle.call_args[0][0]
+    assert_that(summary.counters, contains_exactly(
+        has_entries(template="foo", count=2),
+    ))
+
+
+def test_counting_handler_resets_in_forked_child():
+    handler = CountingHandler()
+
+    handler.handle(make_record("foo"))
+    handler.after_fork_in_child()
+
+    assert_that(handler.summarize(), is_(equal_to([])))
+
+
+def test_flight_recorder_replays_context_on_error():
+    target = MagicMock(level=INFO, filters=[])
+    handler = FlightRecorderHandler(capacity=2, target=target, keys=["request_id"])
+
+    for message in ("foo", "bar", "baz"):
+        handler.handle(make_record(message, level=DEBUG, request_id="A"))
+    handler.handle(make_record("info", request_id="A"))
+    handler.handle(make_record("other", level=DEBUG, request_id="B"))
+    handler.handle(make_record("error", level=ERROR, request_id="A"))
+
+    # only the most recent records that the target did not emit are replayed
+    assert_that(
+        [call[0][0].msg for call in target.emit.call_args_list],
+        contains_exactly("bar", "baz"),
+    )
+    assert_that(list(handler.contexts), contains_exactly("B"))
+
+
+def test_flight_recorder_ignores_records_outside_of_contexts():
+    target = MagicMock(level=INFO, filters=[])
+    handler = FlightRecorderHandler(target=target, keys=["request_id"])
+
+    handler.handle(make_record("foo", level=DEBUG))
+    handler.handle(make_record("error", level=ERROR))
+
+    assert_that(handler.contexts, is_(equal_to({})))
+    assert_that(target.emit.call_count, is_(equal_to(0)))
+
+
+def test_flight_recorder_replays_past_sampling_but_not_routing():
+    target = MagicMock(level=INFO, filters=[
+        SamplingFilter(rate=0.0),
+        RoutingFilter(exclude=["noisy"]),
+    ])
+    handler = FlightRecorderHandler(target=target, keys=["request_id"])
+
+    handler.handle(make_record("foo", level=DEBUG, request_id="A"))
+    handler.handle(make_record("bar", name="noisy", level=DEBUG, request_id="A"))
+    handler.handle(make_record("sampled", level=INFO, request_id="A"))
+    handler.handle(make_record("error", level=ERROR, request_id="A"))
+
+    assert_that(
+        [call[0][0].msg for call in target.emit.call_args_list],
+        contains_exactly("foo", "sampled"),
+    )
+
+
+def test_flight_recorder_bounds_contexts():
+    handler = FlightRecorderHandler(max_contexts=2, keys=["request_id"])
+
+    for request_id in ("A", "B", "A", "C"):
+        handler.handle(make_record("foo", level=DEBUG, request_id=request_id))
+
+    assert_that(list(handler.contexts), contains_exactly("A", "C"))
@@ -0,0 +1,109 @@
+"""
+Record size limit tests.
+
+"""
+from hamcrest import (
+    assert_that,
+    contains_exactly,
+    equal_to,
+    greater_than,
+    has_entries,
+    is_,
+)
+
+from microcosm_logging.limits import (
+    TRUNCATION_KEY,
+    TRUNCATION_MARKER,
+    RecordLimits,
+    truncations,
+)
+
+
+def test_limit_message():
+    limits = RecordLimits(max_message_length=3)
+
+    assert_that(limits.limit_message("foo"), is_(equal_to("foo")))
+    assert_that(limits.limit_message("foobar"), is_(equal_to("foo" + TRUNCATION_MARKER)))
+
+
+def test_limit_field_length():
+    limits = RecordLimits(max_field_length=3)
+
+    assert_that(
+        limits.limit_fields(dict(foo="barbaz", bar=b"bazqux", baz=42)),
+        has_entries(
+            foo="bar" + TRUNCATION_MARKER,
+            bar=b"baz" + TRUNCATION_MARKER.encode(),
+            baz=42,
+        ),
+    )
+
+
+def test_limit_collection_length():
+    limits = RecordLimits(max_collection_length=2)
+
+    assert_that(
+        limits.limit_fields(dict(foo=list(range(1000)), bar=dict(a=1, b=2, c=3))),
+        has_entries(
+            foo=contains_exactly(0, 1, TRUNCATION_MARKER),
+            bar={"a": 1, "b": 2, TRUNCATION_KEY: TRUNCATION_MARKER},
+        ),
+    )
+
+
+def test_limit_objects_as_strings():
+    class Sized:
+        def __init__(self, size):
+            self.size = size
+
+        def __str__(self):
+            return "x" * self.size
+
+    limits = RecordLimits(max_field_length=3)
+    small = Sized(3)
+
+    assert_that(
+        limits.limit_fields(dict(foo=Sized(1000), bar=small, baz=None)),
+        has_entries(
+            foo="xxx" + TRUNCATION_MARKER,
+            bar=small,
+            baz=None,
+        ),
+    )
+
+
+def test_limit_depth():
+    limits = RecordLimits(max_depth=1)
+
+    assert_that(
+        limits.limit_fields(dict(foo=dict(bar=dict(baz="qux")))),
+        has_entries(
+            foo=dict(bar=TRUNCATION_MARKER),
+        ),
+    )
+
+
+def test_limit_record_bytes():
+    limits = RecordLimits(max_record_bytes=10)
+    count = truncations["record"]
+
+    assert_that(
+        limits.limit_fields(dict(message="foo", foo="x" * 1000, bar="bar")),
+        has_entries(
+            message="foo",
+            foo="x" * 7 + TRUNCATION_MARKER,
+            bar=TRUNCATION_MARKER,
+        ),
+    )
+    assert_that(truncations["record"], is_(greater_than(count)))
+
+
+def test_limit_record_bytes_in_mapping():
+    limits = RecordLimits(max_record_bytes=10)
+
+    assert_that(
+        limits.limit_fields(dict(foo=dict(bar="x" * 1000, baz="baz"))),
+        has_entries(
+            foo={"bar": "x" * 10 + TRUNCATION_MARKER, TRUNCATION_KEY: TRUNCATION_MARKER},
+        ),
+    )
@@ -0,0 +1,80 @@
+"""
+Logging profiler tests.
+
+"""
+from io import StringIO
+from logging import (
+    DEBUG,
+    Logger,
+    StreamHandler,
+    getLogRecordFactory,
+    setLogRecordFactory,
+)
+from unittest import TestCase
+
+from hamcrest import (
+    assert_that,
+    contains_string,
+    equal_to,
+    greater_than,
+    has_length,
+    is_,
+)
+
+from microcosm_logging.profiling import LoggingProfiler
+
+
+class TestLoggingProfiler(TestCase):
+
+    def setUp(self):
+        self.factory = getLogRecordFactory()
+        self.stream = StringIO()
+        self.handler = StreamHandler(self.stream)
+        self.handler.set_name("stream")
+        self.logger = Logger("profiled", DEBUG)
+        self.logger.addHandler(self.handler)
+        self.profiler = LoggingProfiler()
+        self.profiler.instrument(self.logger)
+
+    def tearDown(self):
+        setLogRecordFactory(self.factory)
+
+    def test_accounts_per_call_site(self):
+        for _ in range(3):
+            self.logger.info("hot")
+        self.logger.info("cold")
+
+        assert_that(self.profiler.call_sites, has_length(2))
+        counts = sorted(stats.count for stats in self.profiler.call_sites.values())
+        assert_that(counts, is_(equal_to([1, 3])))
+
+    def test_accounts_per_handler(self):
+        self.logger.info("hot")
+
+        stats = self.profiler.handlers["stream"]
+        assert_that(stats.count, is_(equal_to(1)))
+        assert_that(stats.bytes, is_(equal_to(len("hot"))))
+        assert_that(stats.format_time, is_(greater_than(0)))
+        assert_that(self.stream.getvalue(), is_(equal_to("hot\n")))
+
+    def test_instrumentation_is_idempotent(self):
+        self.profiler.instrument(self.logger)
+        self.logger.info("hot")
+
+        assert_that(self.profiler.handlers["stream"].count, is_(equal_to(1)))
+
+    def test_sampling(self):
+        self.profiler.sample_rate = 0.0
+        self.logger.info("hot")
+
+        assert_that(self.profiler.call_sites, has_length(0))
+        assert_that(self.stream.getvalue(), is_(equal_to("hot\n")))
+
+    def test_report(self):
+        self.logger.info("hot")
+
+        stream = StringIO()
+        self.profiler.dump(stream)
+
+        assert_that(stream.getvalue(), contains_string("profiled (" + __file__))
+        assert_that(stream.getvalue(), contains_string("1 records, 3 bytes - stream"))
@@ -0,0 +1,88 @@
+"""
+Extra field tracking tests.
+
+"""
+from json import loads
+from logging import (
+    INFO,
+    WARNING,
+    Logger,
+    LogRecord,
+    getLogRecordFactory,
+    setLogRecordFactory,
+)
+from unittest import TestCase
+
+from hamcrest import (
+    assert_that,
+    contains_exactly,
+    empty,
+    equal_to,
+    is_,
+)
+
+from microcosm_logging.factories import bump_level_factory
+from microcosm_logging.formatters import JSONFormatter
+from microcosm_logging.records import extra_keys, track_extra_keys
+
+
+class TestExtraKeys(TestCase):
+
+    def setUp(self):
+        self.factory = getLogRecordFactory()
+        self.logger = Logger("records")
+
+    def tearDown(self):
+        setLogRecordFactory(self.factory)
+
+    def make_record(self, **extra):
+        return self.logger.makeRecord("records", INFO, __file__, 42, "A sample log.", (), None, extra=extra)
+
+    def test_tracks_extra_keys(self):
+        track_extra_keys()
+
+        record = self.make_record(foo="bar", baz=1)
+        record.message = record.getMessage()
+        record._private = True
+
+        assert_that(extra_keys(record), contains_exactly("foo", "baz"))
+
+    def test_composes_with_bump_level_factory(self):
+        track_extra_keys()
+        setLogRecordFactory(bump_level_factory(dict(records=10)))
+        track_extra_keys()
+
+        record = self.make_record(foo="bar")
+
+        assert_that(record.levelno, is_(equal_to(WARNING)))
+        assert_that(extra_keys(record), contains_exactly("foo"))
+
+    def test_includes_attributes_from_other_factories(self):
+        factory = getLogRecordFactory()
+
+        def apply(*args, **kwargs):
+            record = factory(*args, **kwargs)
+            record.service = "svc"
+            return record
+
+        setLogRecordFactory(apply)
+        track_extra_keys()
+
+        record = self.make_record(foo=1)
+
+        assert_that(extra_keys(record), contains_exactly("service", "foo"))
+        assert_that(
+            loads(JSONFormatter("%(message)s").format(record)),
+            is_(equal_to(dict(message="A sample log.", service="svc", foo=1))),
+        )
+
+    def test_untracked_records_are_scanned(self):
+        record = LogRecord("records", INFO, __file__, 42, "A sample log.", (), None)
+        record.foo = "bar"
+
+        assert_that(extra_keys(record), contains_exactly("foo"))
+
+    def test_no_extra_keys(self):
+        track_extra_keys()
+
+        assert_that(extra_keys(self.make_record()), is_(empty()))
@@ -15,15 +15,20 @@ setup(
     packages=find_packages(exclude=["*.tests", "*.tests.*", "tests.*", "tests"]),
     include_package_data=True,
     zip_safe=False,
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     keywords="microcosm",
     install_requires=[
         "loggly-python-handler>=1.0.0",
         "microcosm>=2.12.0",
-        "python-json-logger>=0.1.9",
+        "python-json-logger>=2.0.7",
         "requests[security]>=2.18.4",
         "python-logstash-async>=2.3.0",
     ],
+    extras_require={
+        "msgpack": [
+            "msgpack>=1.0.0",
+        ],
+    },
     setup_requires=[
         "nose>=1.3.6",
     ],
@@ -37,6 +42,7 @@ setup(
     },
     tests_require=[
         "coverage>=3.7.1",
+        "msgpack>=1.0.0",
         "PyHamcrest>=1.9.0",
     ],
 )